@@ -0,0 +1,21 @@
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, decode_search_cursor
+
+
+class PageParams:
+    decode = staticmethod(decode_cursor)
+
+    def __init__(self, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                 after: Optional[str] = Query(None)):
+        self.limit = limit
+        try:
+            self.after = self.decode(after) if after else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+class SearchPageParams(PageParams):
+    decode = staticmethod(decode_search_cursor)
@@ -1,46 +1,72 @@
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends
 
-from app.core.db.session import get_db_session
+from app.api.deps import PageParams
+from app.core.cache import inspector_cache
+from app.core.db.session import get_async_db_session
+from app.core.export import ExportFormat, export_response
+from app.core.models import models
 from app.core.schemas import inspector_schemas
-from app.services.inspector_service import InspectorService as Service
+from app.core.schemas.bulk_schemas import BulkResult
+from app.core.schemas.pagination_schemas import Page
+from app.services.inspector_service import AsyncInspectorService as Service
 
 router = APIRouter()
 
 
 @router.get("/inspector_id={inspector_id}", response_model=inspector_schemas.Inspector)
-async def get_inspector(inspector_id: UUID, session=Depends(get_db_session)):
-    service = Service(session)
-    inspector = service.get_inspector(inspector_id)
+async def get_inspector(inspector_id: UUID, session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    inspector = await service.get_inspector(inspector_id)
     return inspector
 
 
-@router.get("/all/", response_model=List[inspector_schemas.Inspector])
-async def get_all_inspectors(session=Depends(get_db_session)):
-    service = Service(session)
-    inspectors = service.get_inspectors()
+@router.get("/inspector_id={inspector_id}/stats", response_model=inspector_schemas.RatingStats)
+async def get_inspector_rating_stats(inspector_id: UUID, session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    stats = await service.get_rating_stats(inspector_id)
+    return stats
+
+
+@router.get("/all/", response_model=Page[inspector_schemas.Inspector])
+async def get_all_inspectors(params: PageParams = Depends(), session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    inspectors = await service.get_inspectors(params.limit, params.after)
     return inspectors
 
 
+@router.get("/export")
+async def export_inspectors(format: ExportFormat = ExportFormat.ndjson, session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    return export_response(service.stream_inspectors(), models.Inspector.__table__.columns.keys(), format, "inspectors")
+
+
 @router.post("/", response_model=inspector_schemas.Inspector)
-async def create_inspector(inspector: inspector_schemas.InspectorCreate, session=Depends(get_db_session)):
-    service = Service(session)
-    created_inspector = service.create_inspector(inspector)
+async def create_inspector(inspector: inspector_schemas.InspectorCreate, session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    created_inspector = await service.create_inspector(inspector)
     return created_inspector
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def create_inspectors(inspectors: List[Dict[str, Any]] = Body(...), session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    result = await service.create_inspectors(inspectors)
+    return result
+
+
 @router.put("/inspector_id={inspector_id}", response_model=inspector_schemas.Inspector)
 async def update_inspector(inspector_id: UUID, inspector: inspector_schemas.InspectorUpdate,
-                           session=Depends(get_db_session)):
-    service = Service(session)
-    updated_inspector = service.update_inspector(inspector_id, inspector)
+                           session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    updated_inspector = await service.update_inspector(inspector_id, inspector)
     return updated_inspector
 
 
 @router.delete("/inspector_id={inspector_id}")
-async def delete_inspector(inspector_id: UUID, session=Depends(get_db_session)):
-    service = Service(session)
-    service.delete_inspector(inspector_id)
+async def delete_inspector(inspector_id: UUID, session=Depends(get_async_db_session)):
+    service = Service(session, inspector_cache)
+    await service.delete_inspector(inspector_id)
     return
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from app.core.cache import caches
+from app.core.db.session import get_pool_stats
+
+router = APIRouter()
+
+
+@router.get("/pool")
+async def get_pool_status():
+    return get_pool_stats()
+
+
+@router.get("/cache")
+async def get_cache_status():
+    return {name: cache.stats() for name, cache in caches.items()}
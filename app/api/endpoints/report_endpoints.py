@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+
+from app.core.analytics import assignment_snapshot
+from app.core.db.session import get_async_db_session
+from app.core.schemas import report_schemas
+from app.services.report_service import AsyncReportService as Service
+
+router = APIRouter()
+
+
+@router.get("/on_time", response_model=report_schemas.OnTimeReport)
+async def get_on_time_report(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             session=Depends(get_async_db_session)):
+    service = Service(session, assignment_snapshot)
+    report = await service.get_on_time(start, end)
+    return report
+
+
+@router.get("/lateness", response_model=report_schemas.LatenessReport)
+async def get_lateness_report(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                              session=Depends(get_async_db_session)):
+    service = Service(session, assignment_snapshot)
+    report = await service.get_lateness(start, end)
+    return report
+
+
+@router.get("/throughput", response_model=List[report_schemas.TimezoneThroughput])
+async def get_throughput_report(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                session=Depends(get_async_db_session)):
+    service = Service(session, assignment_snapshot)
+    report = await service.get_throughput(start, end)
+    return report
+
+
+@router.get("/ratings", response_model=report_schemas.RatingDistribution)
+async def get_rating_report(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            session=Depends(get_async_db_session)):
+    service = Service(session, assignment_snapshot)
+    report = await service.get_ratings(start, end)
+    return report
@@ -1,76 +1,154 @@
-from typing import List
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 
-from app.core.db.session import get_db_session
+from app.api.deps import PageParams
+from app.core.db.session import get_async_db_session
+from app.core.etag import compute_etag, not_modified
+from app.core.events import sse_stream
+from app.core.export import ExportFormat, export_response
 from app.core.schemas import task_assignment_schemas as schemas
-from app.services.task_assignment_service import TaskAssignmentService as Service
+from app.core.schemas.bulk_schemas import BulkResult
+from app.core.schemas.pagination_schemas import Page
+from app.services.task_assignment_service import EXPORT_COLUMNS, AsyncTaskAssignmentService as Service
 
 router = APIRouter()
 
 
 @router.get("/task_assignment_id={task_assignment_id}", response_model=schemas.TaskAssignment)
-async def get_assigned_task(task_assignment_id: UUID, session=Depends(get_db_session)):
+async def get_assigned_task(task_assignment_id: UUID, session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_task = service.get_assigned_task(task_assignment_id)
+    assigned_task = await service.get_assigned_task(task_assignment_id)
     return assigned_task
 
 
-@router.get("/all/", response_model=List[schemas.TaskAssignment])
-async def get_all_assigned_tasks(session=Depends(get_db_session)):
+@router.get("/all/", response_model=Page[schemas.TaskAssignment])
+async def get_all_assigned_tasks(params: PageParams = Depends(), session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_tasks = service.get_assigned_tasks()
+    assigned_tasks = await service.get_assigned_tasks(params.limit, params.after)
     return assigned_tasks
 
 
-@router.get("/inspector_id={inspector_id}/all/", response_model=List[schemas.TaskAssignment])
-async def get_all_assigned_tasks_from_inspector(inspector_id: UUID, session=Depends(get_db_session)):
+@router.get("/export")
+async def export_assigned_tasks(format: ExportFormat = ExportFormat.ndjson, session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_tasks = service.get_from_inspector(inspector_id)
+    return export_response(service.stream_assigned_tasks(), [column.key for column in EXPORT_COLUMNS], format,
+                           "task_assignments")
+
+
+@router.get("/inspector_id={inspector_id}/all/", response_model=Page[schemas.TaskAssignment])
+async def get_all_assigned_tasks_from_inspector(inspector_id: UUID, response: Response,
+                                                params: PageParams = Depends(),
+                                                if_none_match: Optional[str] = Header(None),
+                                                session=Depends(get_async_db_session)):
+    service = Service(session)
+    etag = compute_etag(*await service.get_version_from_inspector(inspector_id), params.limit, params.after)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    assigned_tasks = await service.get_from_inspector(inspector_id, params.limit, params.after)
     return assigned_tasks
 
 
-@router.get("/inspector_id={inspector_id}/unfinished/all/", response_model=List[schemas.TaskAssignment])
-async def get_unfinished_tasks_from_inspector(inspector_id: UUID, session=Depends(get_db_session)):
+@router.get("/inspector_id={inspector_id}/unfinished/all/", response_model=Page[schemas.TaskAssignment])
+async def get_unfinished_tasks_from_inspector(inspector_id: UUID, response: Response,
+                                              params: PageParams = Depends(),
+                                              if_none_match: Optional[str] = Header(None),
+                                              session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_tasks = service.get_unfinished_from_inspector(inspector_id)
+    etag = compute_etag(*await service.get_version_from_inspector(inspector_id, finished=False),
+                        params.limit, params.after)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    assigned_tasks = await service.get_unfinished_from_inspector(inspector_id, params.limit, params.after)
     return assigned_tasks
 
 
-@router.get("/inspector_id={inspector_id}/finished/all/", response_model=List[schemas.TaskAssignment])
-async def get_finished_tasks_from_inspector(inspector_id: UUID, session=Depends(get_db_session)):
+@router.get("/inspector_id={inspector_id}/finished/all/", response_model=Page[schemas.TaskAssignment])
+async def get_finished_tasks_from_inspector(inspector_id: UUID, response: Response,
+                                            params: PageParams = Depends(),
+                                            if_none_match: Optional[str] = Header(None),
+                                            session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_tasks = service.get_finished_from_inspector(inspector_id)
+    etag = compute_etag(*await service.get_version_from_inspector(inspector_id, finished=True),
+                        params.limit, params.after)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    response.headers["ETag"] = etag
+    assigned_tasks = await service.get_finished_from_inspector(inspector_id, params.limit, params.after)
     return assigned_tasks
 
 
+@router.get("/inspector_id={inspector_id}/changes", response_model=schemas.InspectorChanges)
+async def get_changes_from_inspector(inspector_id: UUID, since: Optional[datetime] = None,
+                                     session=Depends(get_async_db_session)):
+    service = Service(session)
+    changes = await service.get_changes_from_inspector(inspector_id, since)
+    return changes
+
+
+@router.get("/inspector_id={inspector_id}/events")
+async def stream_inspector_events(inspector_id: UUID):
+    return StreamingResponse(sse_stream(inspector_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 @router.post("/assign/inspector_id={inspector_id}&task_id={task_id}", response_model=schemas.TaskAssignment)
 async def create_assigned_task(inspector_id: UUID, task_id: UUID, task: schemas.TaskAssignmentCreate,
-                               session=Depends(get_db_session)):
+                               session=Depends(get_async_db_session)):
     service = Service(session)
-    created_task = service.assign_task(inspector_id, task_id, task)
+    created_task = await service.assign_task(inspector_id, task_id, task)
     return created_task
 
 
+@router.post("/claim_next/inspector_id={inspector_id}", response_model=schemas.TaskAssignment)
+async def claim_next_task(inspector_id: UUID, task: schemas.TaskAssignmentCreate, location: Optional[str] = None,
+                          session=Depends(get_async_db_session)):
+    service = Service(session)
+    claimed_task = await service.claim_next(inspector_id, task, location)
+    return claimed_task
+
+
+@router.post("/schedule", response_model=schemas.ScheduleResult)
+async def schedule_tasks(day: date, dry_run: bool = False, session=Depends(get_async_db_session)):
+    service = Service(session)
+    schedule = await service.schedule(day, dry_run)
+    return schedule
+
+
+@router.post("/assign/bulk", response_model=BulkResult)
+async def create_assigned_tasks(task_assignments: List[Dict[str, Any]] = Body(...),
+                                session=Depends(get_async_db_session)):
+    service = Service(session)
+    created_tasks = await service.assign_tasks(task_assignments)
+    return created_tasks
+
+
 @router.post("/finish/task_assignment_id={task_assignment_id}", response_model=schemas.TaskAssignment)
 async def finish_assigned_task(task_assignment_id: UUID, task: schemas.TaskAssignmentEvaluation,
-                               session=Depends(get_db_session)):
+                               session=Depends(get_async_db_session)):
     service = Service(session)
-    finished_task = service.finish_task(task_assignment_id, task)
+    finished_task = await service.finish_task(task_assignment_id, task)
     return finished_task
 
 
 @router.put("/task_assignment_id={task_assignment_id}", response_model=schemas.TaskAssignment)
 async def update_assigned_task(task_assignment_id: UUID, task: schemas.TaskAssignmentUpdate,
-                               session=Depends(get_db_session)):
+                               session=Depends(get_async_db_session)):
     service = Service(session)
-    assigned_task = service.update_assigned_task(task_assignment_id, task)
+    assigned_task = await service.update_assigned_task(task_assignment_id, task)
     return assigned_task
 
 
 @router.delete("/task_assignment_id={task_assignment_id}")
-async def delete_assigned_task(task_assignment_id: UUID, session=Depends(get_db_session)):
+async def delete_assigned_task(task_assignment_id: UUID, session=Depends(get_async_db_session)):
     service = Service(session)
-    service.delete_assigned_task(task_assignment_id)
+    await service.delete_assigned_task(task_assignment_id)
     return
@@ -1,53 +1,83 @@
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query
 
-from app.core.db.session import get_db_session
+from app.api.deps import PageParams, SearchPageParams
+from app.core.cache import task_cache
+from app.core.db.session import get_async_db_session
+from app.core.export import ExportFormat, export_response
 from app.core.schemas import task_schemas as schemas
-from app.services.task_service import TaskService as Service
+from app.core.schemas.bulk_schemas import BulkResult
+from app.core.schemas.pagination_schemas import Page
+from app.services.task_service import EXPORT_COLUMNS, AsyncTaskService as Service
 
 router = APIRouter()
 
 
 @router.get("/task_id={task_id}", response_model=schemas.Task)
-async def get_task(task_id: UUID, session=Depends(get_db_session)):
-    service = Service(session)
-    task = service.get_task(task_id)
+async def get_task(task_id: UUID, session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    task = await service.get_task(task_id)
     return task
 
 
-@router.get("/all/", response_model=List[schemas.Task])
-async def get_all_tasks(session=Depends(get_db_session)):
-    service = Service(session)
-    tasks = service.get_tasks()
+@router.get("/all/", response_model=Page[schemas.Task])
+async def get_all_tasks(params: PageParams = Depends(), session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    tasks = await service.get_tasks(params.limit, params.after)
     return tasks
 
 
-@router.get("/available/all", response_model=List[schemas.Task])
-async def get_all_available_tasks(session=Depends(get_db_session)):
-    service = Service(session)
-    available_tasks = service.get_available_tasks()
+@router.get("/export")
+async def export_tasks(format: ExportFormat = ExportFormat.ndjson, session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    return export_response(service.stream_tasks(), [column.key for column in EXPORT_COLUMNS], format, "tasks")
+
+
+@router.get("/available/all", response_model=Page[schemas.Task])
+async def get_all_available_tasks(deadline_after: Optional[datetime] = None, deadline_before: Optional[datetime] = None,
+                                  location: Optional[str] = None, params: PageParams = Depends(),
+                                  session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    available_tasks = await service.get_available_tasks(params.limit, params.after, deadline_after, deadline_before,
+                                                        location)
     return available_tasks
 
 
+@router.get("/search", response_model=Page[schemas.Task])
+async def search_tasks(q: str = Query(..., min_length=1), params: SearchPageParams = Depends(),
+                       session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    tasks = await service.search_tasks(q, params.limit, params.after)
+    return tasks
+
+
 @router.post("/", response_model=schemas.Task)
-async def create_task(task: schemas.TaskCreate, session=Depends(get_db_session)):
-    service = Service(session)
-    created_task = service.create_task(task)
+async def create_task(task: schemas.TaskCreate, session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    created_task = await service.create_task(task)
     return created_task
 
 
+@router.post("/bulk", response_model=BulkResult)
+async def create_tasks(tasks: List[Dict[str, Any]] = Body(...), session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    result = await service.create_tasks(tasks)
+    return result
+
+
 @router.put("/task_id={task_id}", response_model=schemas.Task)
 async def update_task(task_id: UUID, task: schemas.TaskUpdate,
-                      session=Depends(get_db_session)):
-    service = Service(session)
-    updated_task = service.update_task(task_id, task)
+                      session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    updated_task = await service.update_task(task_id, task)
     return updated_task
 
 
 @router.delete("/task_id={task_id}")
-async def delete_task(task_id: UUID, session=Depends(get_db_session)):
-    service = Service(session)
-    service.delete_task(task_id)
+async def delete_task(task_id: UUID, session=Depends(get_async_db_session)):
+    service = Service(session, task_cache)
+    await service.delete_task(task_id)
     return
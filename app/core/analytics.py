@@ -0,0 +1,182 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import scheduler
+from app.core.config.settings import get_settings
+from app.core.export import stream_batches
+from app.core.models import models
+from app.core.ratings import RATING_BUCKET_BOUNDS
+from app.core.schemas.task_assignment_schemas import Status
+
+SNAPSHOT_BATCH_SIZE = 10000
+FLOAT_COLUMNS = ("scheduled", "deadline", "evaluated", "rating")
+VERSION_COLUMNS = (models.TaskAssignment.last_update, models.Task.last_update, models.Inspector.last_update)
+VERSION_KEYS = ("last_update", "task_last_update", "inspector_last_update")
+
+
+def epoch(values: Iterable[Optional[datetime]], count: int) -> np.ndarray:
+    """Epoch seconds, with missing datetimes as NaN."""
+    return np.fromiter((value.timestamp() if value is not None else np.nan for value in values),
+                       dtype=np.float64, count=count)
+
+
+class AssignmentSnapshot:
+    """Columnar copy of task_assignments joined to jobs and inspectors, refreshed incrementally.
+
+    Every assignment owns one position in the column arrays; changed rows are overwritten in place and
+    deleted ones are masked out through ``alive``.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.positions: Dict[UUID, int] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self._allocate(0)
+
+    async def refresh(self, db: AsyncSession, max_age: float = 0):
+        """Applies the rows changed since the last refresh, unless it is younger than ``max_age`` seconds."""
+        async with self._refresh_lock():
+            if self.refreshed_at is not None and time.monotonic() - self.refreshed_at < max_age:
+                return
+            started = time.monotonic()
+            statement = select(models.TaskAssignment.id, models.TaskAssignment.scheduled_datetime,
+                               models.TaskAssignment.evaluation_datetime, models.TaskAssignment.rating,
+                               models.TaskAssignment.status, models.TaskAssignment.last_update,
+                               models.Task.deadline, models.Inspector.timezone,
+                               models.Task.last_update.label("task_last_update"),
+                               models.Inspector.last_update.label("inspector_last_update")) \
+                .outerjoin(models.Task, models.Task.id == models.TaskAssignment.task_id) \
+                .outerjoin(models.Inspector, models.Inspector.id == models.TaskAssignment.inspector_id)
+            deleted = select(models.DeletedRecord.record_id, models.DeletedRecord.deleted_at) \
+                .where(models.DeletedRecord.table_name == models.TaskAssignment.__tablename__)
+            if self.watermark is not None:
+                lower_bound = self.watermark - timedelta(seconds=get_settings().CHANGE_FEED_OVERLAP_SECONDS)
+                # Deadline and timezone changes do not touch the assignment row, so they are tracked as well; one
+                # branch per table keeps each on its last_update index.
+                statement = union(*(statement.where(version > lower_bound) for version in VERSION_COLUMNS))
+                deleted = deleted.where(models.DeletedRecord.deleted_at > lower_bound)
+
+            versions = [self.watermark] if self.watermark is not None else []
+            async for batch in stream_batches(db, statement, SNAPSHOT_BATCH_SIZE):
+                self.apply(batch)
+                versions.extend(row[key] for row in batch for key in VERSION_KEYS if row[key] is not None)
+            tombstones = (await db.execute(deleted)).all()
+            self.remove([tombstone.record_id for tombstone in tombstones])
+            versions.extend(tombstone.deleted_at for tombstone in tombstones)
+
+            self.watermark = max(versions, default=None)
+            self.refreshed_at = started
+
+    def _refresh_lock(self) -> asyncio.Lock:
+        """One lock per event loop: the module-level snapshot is built at import, possibly in a preloading master
+        process whose loop is not the one serving requests."""
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        return self._lock
+
+    def apply(self, rows: List[Mapping]):
+        positions = np.fromiter((self._position(row["id"]) for row in rows), dtype=np.int64, count=len(rows))
+        self.columns["scheduled"][positions] = epoch((row["scheduled_datetime"] for row in rows), len(rows))
+        self.columns["deadline"][positions] = epoch((row["deadline"] for row in rows), len(rows))
+        self.columns["evaluated"][positions] = epoch((row["evaluation_datetime"] for row in rows), len(rows))
+        self.columns["rating"][positions] = np.fromiter(
+            (row["rating"] if row["rating"] is not None else np.nan for row in rows), dtype=np.float64,
+            count=len(rows))
+        self.columns["completed"][positions] = [row["status"] == Status.completed for row in rows]
+        self.columns["timezone"][positions] = [scheduler.group_of(row["timezone"]) for row in rows]
+        self.columns["alive"][positions] = True
+
+    def remove(self, ids: Iterable[UUID]):
+        positions = [self.positions[record_id] for record_id in ids if record_id in self.positions]
+        self.columns["alive"][positions] = False
+
+    def select(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """Column views restricted to live assignments scheduled within [start, end)."""
+        mask = self.columns["alive"][:self.size].copy()
+        scheduled = self.columns["scheduled"][:self.size]
+        if start is not None:
+            mask &= scheduled >= start.timestamp()
+        if end is not None:
+            mask &= scheduled < end.timestamp()
+        return {name: column[:self.size][mask] for name, column in self.columns.items()}
+
+    def _position(self, record_id: UUID) -> int:
+        position = self.positions.get(record_id)
+        if position is None:
+            if self.size == len(self.columns["alive"]):
+                self._allocate(max(1024, 2 * self.size))
+            position = self.positions[record_id] = self.size
+            self.size += 1
+        return position
+
+    def _allocate(self, capacity: int):
+        def grow(name, dtype, fill):
+            column = np.full(capacity, fill, dtype=dtype)
+            if name in self.columns:
+                column[:self.size] = self.columns[name][:self.size]
+            return column
+
+        self.columns = {
+            **{name: grow(name, np.float64, np.nan) for name in FLOAT_COLUMNS},
+            "completed": grow("completed", bool, False),
+            "timezone": grow("timezone", np.int8, scheduler.NO_GROUP),
+            "alive": grow("alive", bool, False),
+        }
+
+
+assignment_snapshot = AssignmentSnapshot()
+
+
+def on_time_report(columns: Dict[str, np.ndarray]) -> Dict:
+    finished = columns["completed"] & ~np.isnan(columns["deadline"]) & ~np.isnan(columns["evaluated"])
+    on_time = int(np.count_nonzero(columns["evaluated"][finished] <= columns["deadline"][finished]))
+    total = int(np.count_nonzero(finished))
+    return {"completed": int(np.count_nonzero(columns["completed"])), "with_deadline": total, "on_time": on_time,
+            "on_time_rate": on_time / total if total else None}
+
+
+def lateness_report(columns: Dict[str, np.ndarray]) -> Dict:
+    finished = columns["completed"] & ~np.isnan(columns["deadline"]) & ~np.isnan(columns["evaluated"])
+    lateness = np.clip(columns["evaluated"][finished] - columns["deadline"][finished], 0, None)
+    late = lateness[lateness > 0]
+    return {"late": int(late.size),
+            "average_lateness_seconds": float(lateness.mean()) if lateness.size else None,
+            "average_lateness_of_late_seconds": float(late.mean()) if late.size else None,
+            "max_lateness_seconds": float(late.max()) if late.size else None}
+
+
+def throughput_report(columns: Dict[str, np.ndarray], days: float) -> List[Dict]:
+    """Completed assignments per inspector timezone; the last entry collects unknown timezones."""
+    completed = np.bincount(columns["timezone"][columns["completed"]].astype(np.int64) + 1,
+                            minlength=len(scheduler.GROUPS) + 1)
+    names = [None] + scheduler.GROUPS
+    return [{"timezone": names[group], "completed": int(completed[group]),
+             "per_day": float(completed[group]) / days if days else None}
+            for group in list(range(1, len(names))) + [0]]
+
+
+def rating_report(columns: Dict[str, np.ndarray]) -> Dict:
+    ratings = columns["rating"][columns["completed"] & ~np.isnan(columns["rating"])]
+    bounds = (-np.inf,) + RATING_BUCKET_BOUNDS + (np.inf,)
+    counts, _ = np.histogram(ratings, bins=bounds)
+    labels = (None,) + RATING_BUCKET_BOUNDS + (None,)
+    return {
+        "count": int(ratings.size),
+        "mean": float(ratings.mean()) if ratings.size else None,
+        "p50": float(np.percentile(ratings, 50)) if ratings.size else None,
+        "p90": float(np.percentile(ratings, 90)) if ratings.size else None,
+        "histogram": [{"lower": labels[bucket], "upper": labels[bucket + 1], "count": int(count)}
+                      for bucket, count in enumerate(counts)],
+    }
@@ -0,0 +1,37 @@
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import cast, literal
+from sqlalchemy.dialects import postgresql
+
+BULK_INSERT_BATCH_SIZE = 1000
+
+
+def validate_rows(rows: Sequence[Dict[str, Any]], schema: Type[BaseModel]) \
+        -> Tuple[List[Tuple[int, BaseModel]], List[Dict]]:
+    """Splits ``rows`` into (index, parsed row) pairs and per-row error results."""
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schema.parse_obj(row)))
+        except ValidationError as e:
+            errors.append({"index": index, "error": "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors())})
+    return valid, errors
+
+
+def chunked(items: Sequence, size: int = BULK_INSERT_BATCH_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_result(results: List[Dict]) -> Dict:
+    results = sorted(results, key=lambda result: result["index"])
+    failed = sum(1 for result in results if result.get("error"))
+    return {"created": len(results) - failed, "failed": failed, "items": results}
+
+
+def typed_array(values: Sequence, type_):
+    """Binds ``values`` as a single explicitly typed Postgres array parameter, e.g. for ``unnest``."""
+    array_type = postgresql.ARRAY(type_)
+    return cast(literal(list(values), array_type), array_type)
@@ -0,0 +1,111 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Bounded LRU cache whose entries also expire ``ttl`` seconds after being stored.
+
+    ``max_size`` and ``ttl`` default to CACHE_MAX_SIZE and CACHE_TTL_SECONDS, read on first use.
+    """
+
+    def __init__(self, name: str, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.name = name
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size if self._max_size is not None else get_settings().CACHE_MAX_SIZE
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else get_settings().CACHE_TTL_SECONDS
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+inspector_cache = LRUCache("inspector")
+task_cache = LRUCache("task")
+caches = {cache.name: cache for cache in (inspector_cache, task_cache)}
+
+
+async def publish_invalidation(db: AsyncSession, cache: LRUCache, key: UUID):
+    """Queues a NOTIFY in the current transaction so other workers drop ``key`` once it commits."""
+    channel = get_settings().CACHE_INVALIDATION_CHANNEL
+    if channel:
+        await db.execute(select(func.pg_notify(channel, f"{cache.name}:{key}")))
+
+
+def handle_invalidation(payload: str):
+    try:
+        name, key = payload.split(":", 1)
+        caches[name].invalidate(UUID(key))
+    except (KeyError, ValueError):
+        logger.warning("Ignoring malformed cache invalidation %r", payload)
+
+
+def clear_caches():
+    for cache in caches.values():
+        cache.clear()
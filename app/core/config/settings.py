@@ -1,20 +1,94 @@
 import os
-from dotenv import load_dotenv
+from functools import lru_cache
 
-load_dotenv('dev.env')
+from dotenv import load_dotenv
 
 
 class Settings:
-    PROJECT_NAME: str = os.getenv("PROJECT_NAME")
-    DEBUG: bool = os.getenv("DEBUG")
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL")
-
-    POSTGRES_NAME = os.getenv("POSTGRES_NAME")
-    POSTGRES_DB = os.getenv("POSTGRES_DB")
-    POSTGRES_USER = os.getenv("POSTGRES_USER")
-    POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-    DATABASE_PORT = os.getenv("DATABASE_PORT")
-    DATABASE_HOST = os.getenv("DATABASE_HOST")
-
-    #DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{POSTGRES_DB}"
-    DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_NAME}:{DATABASE_PORT}/{POSTGRES_DB}"
+    """Configuration read from the environment (and dev.env) when instantiated; use ``get_settings()``."""
+
+    def __init__(self):
+        self.PROJECT_NAME: str = os.getenv("PROJECT_NAME")
+        self.DEBUG: bool = os.getenv("DEBUG")
+        self.LOG_LEVEL: str = os.getenv("LOG_LEVEL")
+
+        self.POSTGRES_NAME = os.getenv("POSTGRES_NAME")
+        self.POSTGRES_DB = os.getenv("POSTGRES_DB")
+        self.POSTGRES_USER = os.getenv("POSTGRES_USER")
+        self.POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+        self.DATABASE_PORT = os.getenv("DATABASE_PORT")
+        self.DATABASE_HOST = os.getenv("DATABASE_HOST")
+
+        #DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DATABASE_HOST}:{DATABASE_PORT}/{POSTGRES_DB}"
+        credentials = f"{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+        self.DATABASE_URL = f"postgresql://{credentials}@{self.POSTGRES_NAME}:{self.DATABASE_PORT}/{self.POSTGRES_DB}"
+        self.ASYNC_DATABASE_URL = \
+            f"postgresql+asyncpg://{credentials}@{self.POSTGRES_NAME}:{self.DATABASE_PORT}/{self.POSTGRES_DB}"
+
+        self.DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+        self.DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+        self.DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+        self.DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+        self.DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        # Turns off the prepared statement caches behind PgBouncer. Session pooling only: SQLAlchemy 1.4's asyncpg
+        # dialect still prepares named statements, which transaction pooling may run on another server connection.
+        self.DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+        self.CACHE_MAX_SIZE: int = int(os.getenv("CACHE_MAX_SIZE", 10000))
+        self.CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", 60))
+        # NOTIFY channel used to invalidate the caches of the other workers; empty disables it.
+        self.CACHE_INVALIDATION_CHANNEL: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+
+        # Logs every statement; for debugging only.
+        self.SQL_ECHO: bool = os.getenv("SQL_ECHO", "false").lower() == "true"
+        # Statements slower than SLOW_QUERY_THRESHOLD_MS are logged (0 disables it), a SLOW_QUERY_SAMPLE_RATE
+        # fraction of them. SLOW_QUERY_EXPLAIN re-runs slow SELECTs under EXPLAIN ANALYZE from a background thread.
+        self.SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+        self.SLOW_QUERY_SAMPLE_RATE: float = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", 1))
+        self.SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+
+        # On-demand profiling: requests with an X-Profile-Token header matching PROFILE_TOKEN (empty disables it)
+        # and a fraction of the requests to the routes in PROFILE_SAMPLE_RATES, by path template or endpoint name
+        # ("/task/available/all=0.01,create_assigned_task=1"), are sampled every PROFILE_INTERVAL_MS into folded
+        # stacks in PROFILE_DIR.
+        self.PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+        self.PROFILE_SAMPLE_RATES: str = os.getenv("PROFILE_SAMPLE_RATES", "")
+        self.PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+        self.PROFILE_DIR: str = os.getenv("PROFILE_DIR", "/tmp/profiles")
+
+        # Change feeds re-read this much history before the client's watermark to catch late-committing writes.
+        self.CHANGE_FEED_OVERLAP_SECONDS: float = float(os.getenv("CHANGE_FEED_OVERLAP_SECONDS", 5))
+
+        self.ASSIGNMENT_EVENTS_CHANNEL: str = os.getenv("ASSIGNMENT_EVENTS_CHANNEL", "assignment_events")
+        self.ASSIGNMENT_EVENTS_HEARTBEAT_SECONDS: float = float(os.getenv("ASSIGNMENT_EVENTS_HEARTBEAT_SECONDS", 15))
+
+        # Time an inspector is booked for by an assignment; changing it requires re-running migrate.
+        self.ASSIGNMENT_SLOT_MINUTES: int = int(os.getenv("ASSIGNMENT_SLOT_MINUTES", 60))
+
+        # Daily planning: assignments per inspector and day, and local start of the working day.
+        self.SCHEDULER_INSPECTOR_CAPACITY: int = int(os.getenv("SCHEDULER_INSPECTOR_CAPACITY", 8))
+        self.SCHEDULER_WORKDAY_START_HOUR: int = int(os.getenv("SCHEDULER_WORKDAY_START_HOUR", 9))
+
+        # Reports reuse the in-memory assignment snapshot for this long before pulling changes;
+        # 0 rebuilds it per request.
+        self.ANALYTICS_REFRESH_SECONDS: float = float(os.getenv("ANALYTICS_REFRESH_SECONDS", 60))
+
+        # Production server (python main.py serve). WEB_CONCURRENCY=0 runs one worker per available core; each
+        # worker has its own pools, so the database must accept
+        # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+        self.HOST: str = os.getenv("HOST", "0.0.0.0")
+        self.PORT: int = int(os.getenv("PORT", 5050))
+        self.WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", 0))
+        # Workers are recycled after MAX_REQUESTS (+ up to MAX_REQUESTS_JITTER) requests; 0 disables it.
+        self.MAX_REQUESTS: int = int(os.getenv("MAX_REQUESTS", 10000))
+        self.MAX_REQUESTS_JITTER: int = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+        self.GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+        self.KEEPALIVE_SECONDS: int = int(os.getenv("KEEPALIVE_SECONDS", 5))
+        # Open the pool connections when a worker starts instead of on its first requests.
+        self.DB_POOL_WARMUP: bool = os.getenv("DB_POOL_WARMUP", "true").lower() == "true"
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    load_dotenv('dev.env')
+    return Settings()
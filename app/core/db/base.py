@@ -2,12 +2,11 @@ from datetime import datetime
 
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 from sqlalchemy import MetaData, Column, Integer, DateTime
-from app.core.db.session import get_db_conn
 
 metadata = MetaData()
 
 
-@as_declarative(bind=get_db_conn())
+@as_declarative()
 class Base:
     id = Column(Integer, primary_key=True, index=True, unique=True)
     created_at = Column(DateTime, default=datetime.utcnow)
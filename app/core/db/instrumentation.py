@@ -0,0 +1,191 @@
+import collections
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.cursor import _DEFAULT_FETCH, BufferedRowCursorFetchStrategy, CursorFetchStrategy
+
+from app.core import profiling
+from app.core.metrics import RequestStats, current_request
+
+logger = logging.getLogger("app.slow_query")
+
+SERVICES_PACKAGE = "app.services."
+EXPLAIN_QUEUE_SIZE = 100
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+class _RowCounter:
+    """Adds the rows handed to the result to the request stats; asyncpg reports no rowcount for SELECTs."""
+
+    __slots__ = ()
+
+    def fetchone(self, result, dbapi_cursor, hard_close=False):
+        row = super().fetchone(result, dbapi_cursor, hard_close)
+        if row is not None:
+            self.stats.rows += 1
+        return row
+
+    def fetchmany(self, result, dbapi_cursor, size=None):
+        rows = super().fetchmany(result, dbapi_cursor, size)
+        self.stats.rows += len(rows or ())
+        return rows
+
+    def fetchall(self, result, dbapi_cursor):
+        rows = super().fetchall(result, dbapi_cursor)
+        self.stats.rows += len(rows or ())
+        return rows
+
+    def yield_per(self, result, dbapi_cursor, num):
+        result.cursor_strategy = CountingBufferedRowFetchStrategy(
+            self.stats, dbapi_cursor, {"max_row_buffer": num}, initial_buffer=collections.deque(), growth_factor=0)
+
+
+class CountingFetchStrategy(_RowCounter, CursorFetchStrategy):
+    __slots__ = ("stats",)
+
+    def __init__(self, stats: RequestStats):
+        self.stats = stats
+
+
+class CountingBufferedRowFetchStrategy(_RowCounter, BufferedRowCursorFetchStrategy):
+    __slots__ = ("stats",)
+
+    def __init__(self, stats: RequestStats, dbapi_cursor, execution_options, **kwargs):
+        self.stats = stats
+        super().__init__(dbapi_cursor, execution_options, **kwargs)
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - context._query_started
+    if cursor.description is not None and context.cursor_fetch_strategy is _DEFAULT_FETCH:
+        if context._is_server_side or context.execution_options.get("stream_results", False):
+            context.cursor_fetch_strategy = CountingBufferedRowFetchStrategy(stats, cursor,
+                                                                             context.execution_options)
+        else:
+            context.cursor_fetch_strategy = CountingFetchStrategy(stats)
+
+
+def redact(parameters: Any) -> Any:
+    """Keeps the shape of the bound parameters but only the type of each value."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _service_method(frame) -> Optional[str]:
+    if not frame.f_globals.get("__name__", "").startswith(SERVICES_PACKAGE):
+        return None
+    owner = frame.f_locals.get("self")
+    return f"{type(owner).__name__}.{frame.f_code.co_name}" if owner is not None else frame.f_code.co_name
+
+
+def service_method() -> Optional[str]:
+    """The innermost service method on the stack. Async sessions run the driver calls in a greenlet, so the
+    search continues in the suspended frames of its parents."""
+    current, frame = greenlet.getcurrent(), sys._getframe()
+    while True:
+        while frame is not None:
+            method = _service_method(frame)
+            if method:
+                return method
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+class SlowQueryLog:
+    """Logs a sample of the statements slower than ``threshold_ms`` as JSON, with their parameters redacted.
+
+    With ``explain`` the plan of slow SELECTs is captured with ``EXPLAIN (ANALYZE, BUFFERS)`` on a connection of
+    ``explain_engine()`` from a background thread, inside a transaction that is rolled back.
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float = 1.0, explain: bool = False,
+                 explain_engine: Optional[Callable[[], Engine]] = None):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.explain = explain and explain_engine is not None
+        self.explain_engine = explain_engine
+        self._explain_queue = queue.Queue(EXPLAIN_QUEUE_SIZE)
+        self._explain_thread = None
+        self._lock = threading.Lock()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._query_started
+        if seconds < self.threshold or not context.execution_options.get("slow_query_log", True):
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        stats = current_request.get()
+        entry = {
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement,
+            "parameters": f"{len(parameters)} rows" if executemany else redact(parameters),
+            "route": stats.route if stats is not None else None,
+            "service_method": service_method(),
+        }
+        logger.warning(json.dumps(entry))
+
+        if self.explain and not executemany and statement.lstrip()[:6].upper() == "SELECT":
+            self._enqueue_explain(entry, statement, parameters)
+
+    def _enqueue_explain(self, entry, statement, parameters):
+        with self._lock:
+            if self._explain_thread is None:
+                self._explain_thread = threading.Thread(target=self._explain_worker, name="slow-query-explain",
+                                                        daemon=True)
+                self._explain_thread.start()
+        try:
+            self._explain_queue.put_nowait((entry, statement, parameters))
+        except queue.Full:
+            logger.info("Skipping EXPLAIN, %s plans already pending", EXPLAIN_QUEUE_SIZE)
+
+    def _explain_worker(self):
+        while True:
+            entry, statement, parameters = self._explain_queue.get()
+            try:
+                entry = dict(entry, plan=self.explain_plan(statement, parameters))
+                logger.warning(json.dumps(entry, default=str))
+            except Exception:
+                logger.exception("Unable to EXPLAIN slow query")
+
+    def explain_plan(self, statement: str, parameters: Any):
+        with self.explain_engine().connect().execution_options(slow_query_log=False) as conn:
+            transaction = conn.begin()
+            try:
+                return conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                                            parameters).scalar()
+            finally:
+                transaction.rollback()
+
+
+def instrument(engine: Engine, slow_query_log: Optional[SlowQueryLog] = None) -> Engine:
+    """Adds the statements run on ``engine`` to the stats and the profile of the request being served, if any, and
+    to the slow query log."""
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "after_cursor_execute", profiling.after_cursor_execute)
+    if slow_query_log is not None:
+        event.listen(engine, "after_cursor_execute", slow_query_log.after_cursor_execute)
+    return engine
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 5
+
+
+class PgListener:
+    """Keeps one LISTEN connection per worker and hands NOTIFY payloads to the subscribed callbacks.
+
+    ``on_reconnect`` callbacks run after the connection is re-established, since anything
+    notified while it was down has been lost.
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._reconnect_callbacks: List[Callable[[], None]] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._dsn: Optional[str] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._stopped = False
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        self._callbacks[channel].append(callback)
+
+    def on_reconnect(self, callback: Callable[[], None]):
+        self._reconnect_callbacks.append(callback)
+
+    async def start(self, dsn: str):
+        self._dsn = dsn
+        self._stopped = False
+        try:
+            await self._connect()
+        except (OSError, asyncpg.PostgresError):
+            logger.warning("Unable to open LISTEN connection, retrying in %ss", RECONNECT_DELAY_SECONDS)
+            self._reconnect_task = asyncio.get_event_loop().create_task(self._reconnect())
+
+    async def stop(self):
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _connect(self):
+        self._connection = await asyncpg.connect(self._dsn)
+        self._connection.add_termination_listener(self._on_termination)
+        for channel in self._callbacks:
+            await self._connection.add_listener(channel, self._dispatch)
+
+    def _dispatch(self, connection, pid, channel, payload):
+        for callback in self._callbacks[channel]:
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("NOTIFY callback failed for channel %s", channel)
+
+    def _on_termination(self, connection):
+        if not self._stopped:
+            self._reconnect_task = asyncio.get_event_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._stopped:
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+            try:
+                await self._connect()
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("LISTEN connection lost, retrying in %ss", RECONNECT_DELAY_SECONDS)
+                continue
+            for callback in self._reconnect_callbacks:
+                callback()
+            return
+
+
+listener = PgListener()
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import Histogram
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.overflow_checkouts = 0
+        self.wait_seconds = Histogram()
+        self._lock = threading.Lock()
+
+    def incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: Pool) -> Dict:
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "overflow_checkouts": self.overflow_checkouts,
+            "wait_seconds": self.wait_seconds.snapshot(),
+        }
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        idle = not self._pool.empty()
+        has_headroom = self._max_overflow < 0 or self._overflow < self._max_overflow
+        if not idle and not has_headroom:
+            self.metrics.incr("waits")
+        elif not idle and self._overflow >= 0:
+            self.metrics.incr("overflow_checkouts")
+
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        finally:
+            self.metrics.wait_seconds.observe(time.perf_counter() - started)
+        self.metrics.incr("checkouts")
+        return connection
+
+    def _do_return_conn(self, conn):
+        self.metrics.incr("checkins")
+        return super()._do_return_conn(conn)
+
+    def _create_connection(self):
+        self.metrics.incr("connects")
+        return super()._create_connection()
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = PoolMetrics()
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
@@ -1,21 +1,115 @@
+import asyncio
+from functools import lru_cache
+from typing import Dict, Optional
+
 from sqlalchemy import create_engine
 from sqlalchemy.engine.base import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 
-from app.core.config.settings import Settings
+from app.core.config.settings import Settings, get_settings
+from app.core.db.instrumentation import SlowQueryLog, instrument
+from app.core.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+
+
+def get_pool_options(settings: Settings) -> Dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_async_connect_args(settings: Settings) -> Dict:
+    if settings.DB_PGBOUNCER:
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return {}
+
+
+def get_slow_query_log(settings: Settings) -> Optional[SlowQueryLog]:
+    if settings.SLOW_QUERY_THRESHOLD_MS <= 0:
+        return None
+    return SlowQueryLog(settings.SLOW_QUERY_THRESHOLD_MS, settings.SLOW_QUERY_SAMPLE_RATE, settings.SLOW_QUERY_EXPLAIN,
+                        explain_engine=get_engine)
+
+
+# Engines and session factories are built on first use, so importing this module never touches the
+# configuration or the database drivers.
+@lru_cache()
+def get_engine() -> Engine:
+    settings = get_settings()
+    return instrument(create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO, poolclass=InstrumentedQueuePool,
+                                    **get_pool_options(settings)), get_slow_query_log(settings))
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    settings = get_settings()
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, echo=settings.SQL_ECHO,
+                                       poolclass=InstrumentedAsyncAdaptedQueuePool,
+                                       connect_args=get_async_connect_args(settings), **get_pool_options(settings))
+    instrument(async_engine.sync_engine, get_slow_query_log(settings))
+    return async_engine
 
-settings = Settings()
-engine: Engine = create_engine(settings.DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@lru_cache()
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=get_engine())
+
+
+@lru_cache()
+def get_async_sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=get_async_engine(),
+                        class_=AsyncSession)
+
+
+async def dispose_engines():
+    """Closes the pooled connections of the engines created so far."""
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
 
 
 def get_db_session() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    """One session per request; services commit or roll back but never close it."""
+    with get_sessionmaker()() as db:
+        try:
+            yield db
+        except Exception:
+            db.rollback()
+            raise
+
+
+async def get_async_db_session() -> AsyncSession:
+    async with get_async_sessionmaker()() as db:
+        try:
+            yield db
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def warm_up_async_pool(size: int):
+    """Opens ``size`` pooled connections at once and returns them to the pool."""
+    async_engine = get_async_engine()
+    connections = await asyncio.gather(*(async_engine.connect() for _ in range(size)))
+    await asyncio.gather(*(connection.close() for connection in connections))
 
 
 def get_db_conn() -> Engine:
-    return engine
+    return get_engine()
+
+
+def get_pool_stats() -> Dict:
+    """Pool metrics of the engines created so far; reading them never creates one."""
+    stats = {}
+    if get_engine.cache_info().currsize:
+        engine = get_engine()
+        stats["sync"] = engine.pool.metrics.snapshot(engine.pool)
+    if get_async_engine.cache_info().currsize:
+        sync_engine = get_async_engine().sync_engine
+        stats["async"] = sync_engine.pool.metrics.snapshot(sync_engine.pool)
+    return stats
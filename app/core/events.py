@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import AsyncIterator, Dict, List, Set
+from uuid import UUID
+
+from sqlalchemy import String, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bulk import typed_array
+from app.core.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class AssignmentBroker:
+    """Fans the assignment NOTIFY payloads received by this worker out to the inspectors subscribed to them."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, inspector_id: UUID) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[str(inspector_id)].add(queue)
+        return queue
+
+    def unsubscribe(self, inspector_id: UUID, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(str(inspector_id))
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[str(inspector_id)]
+
+    def dispatch(self, payload: str):
+        try:
+            event = json.loads(payload)
+            subscribers = self._subscribers.get(event["inspector_id"], ())
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring malformed assignment event %r", payload)
+            return
+        for queue in subscribers:
+            self._put(queue, event)
+
+    def resync(self):
+        """Tells every subscriber that events may have been lost and it should re-read the change feed."""
+        for subscribers in self._subscribers.values():
+            for queue in subscribers:
+                self._put(queue, {"event": "resync"})
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+broker = AssignmentBroker()
+
+
+async def publish_assignment_events(db: AsyncSession, events: List[Dict]):
+    """Queues one NOTIFY per event in the current transaction; they are delivered only if it commits."""
+    channel = get_settings().ASSIGNMENT_EVENTS_CHANNEL
+    if not channel or not events:
+        return
+    payloads = func.unnest(typed_array([json.dumps(event, default=str) for event in events], String)) \
+        .table_valued("payload").render_derived(name="events")
+    await db.execute(select(func.pg_notify(channel, payloads.c.payload)))
+
+
+def assignment_event(event: str, inspector_id: UUID, task_assignment_id: UUID) -> Dict:
+    return {"event": event, "inspector_id": str(inspector_id), "task_assignment_id": str(task_assignment_id)}
+
+
+async def sse_stream(inspector_id: UUID) -> AsyncIterator[str]:
+    """Server-sent events for ``inspector_id``; StreamingResponse cancels it as soon as the client disconnects."""
+    heartbeat = get_settings().ASSIGNMENT_EVENTS_HEARTBEAT_SECONDS
+    queue = broker.subscribe(inspector_id)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(inspector_id, queue)
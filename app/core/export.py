@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, List, Mapping, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+EXPORT_BATCH_SIZE = 1000
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+async def stream_batches(db: AsyncSession, statement: Select, batch_size: int = EXPORT_BATCH_SIZE) \
+        -> AsyncIterator[List[Mapping]]:
+    """Reads ``statement`` through a server-side cursor, ``batch_size`` rows at a time."""
+    result = await db.stream(statement.execution_options(yield_per=batch_size))
+    async for batch in result.mappings().partitions(batch_size):
+        yield batch
+
+
+def _to_json(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_csv(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[Mapping]]) -> AsyncIterator[str]:
+    async for batch in batches:
+        yield "".join(json.dumps(dict(row), default=_to_json) + "\n" for row in batch)
+
+
+async def csv_chunks(columns: Sequence[str], batches: AsyncIterator[List[Mapping]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_to_csv(row[column]) for column in columns] for row in batch)
+        yield buffer.getvalue()
+
+
+def export_response(batches: AsyncIterator[List[Mapping]], columns: Sequence[str], export_format: ExportFormat,
+                    filename: str) -> StreamingResponse:
+    if export_format == ExportFormat.csv:
+        content, media_type = csv_chunks(columns, batches), "text/csv"
+    else:
+        content, media_type = ndjson_chunks(batches), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    return StreamingResponse(content, media_type=media_type, headers=headers)
@@ -0,0 +1,132 @@
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative, Prometheus-style bucket counts."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = running + counts[-1]
+        return {"buckets": cumulative, "count": cumulative["+Inf"], "sum": total}
+
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """SQL work done while serving one request, filled in by the engine hooks."""
+
+    __slots__ = ("route", "statements", "db_seconds", "rows")
+
+    def __init__(self, route: Optional[str] = None):
+        self.route = route
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_seconds = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.rows = 0
+        self.responses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, status: int, seconds: float, stats: RequestStats):
+        self.latency.observe(seconds)
+        self.db_seconds.observe(stats.db_seconds)
+        self.statements.observe(stats.statements)
+        with self._lock:
+            self.rows += stats.rows
+            self.responses[status] = self.responses.get(status, 0) + 1
+
+
+class RouteRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def get(self, method: str, route: str) -> RouteMetrics:
+        key = (method, route)
+        metrics = self._routes.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._routes.setdefault(key, RouteMetrics())
+        return metrics
+
+    def render(self) -> str:
+        """Renders the collected metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+        lines = []
+        for name, kind, description in METRIC_FAMILIES:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                if name == "http_requests_total":
+                    lines.extend(f'{name}{{{labels},status="{status}"}} {count}'
+                                 for status, count in sorted(metrics.responses.items()))
+                elif name == "db_rows_total":
+                    lines.append(f"{name}{{{labels}}} {metrics.rows}")
+                else:
+                    lines.extend(_histogram_lines(name, labels, getattr(metrics, METRIC_ATTRIBUTES[name])))
+        return "\n".join(lines) + "\n"
+
+
+METRIC_FAMILIES = (
+    ("http_requests_total", "counter", "Responses by route and status code."),
+    ("http_request_duration_seconds", "histogram", "Request latency by route."),
+    ("db_statements_per_request", "histogram", "SQL statements executed per request."),
+    ("db_seconds_per_request", "histogram", "Time spent executing SQL per request."),
+    ("db_rows_total", "counter", "Rows returned by SQL statements."),
+)
+METRIC_ATTRIBUTES = {
+    "http_request_duration_seconds": "latency",
+    "db_statements_per_request": "statements",
+    "db_seconds_per_request": "db_seconds",
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    snapshot = histogram.snapshot()
+    lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']}")
+    lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+    return lines
+
+
+route_metrics = RouteRegistry()
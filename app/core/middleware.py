@@ -0,0 +1,150 @@
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config.settings import get_settings
+from app.core.metrics import RequestStats, RouteRegistry, current_request, route_metrics
+from app.core.profiling import Profile, current_profile, parse_sample_rates, sampler
+
+logger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+PROFILE_HEADER = b"x-profile"
+
+
+def match_route(scope: Scope) -> Optional[BaseRoute]:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def route_of(scope: Scope) -> str:
+    """The path template of the route serving ``scope``, so that path parameters don't explode the label set."""
+    route = match_route(scope)
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Records latency, status and SQL work per route for every HTTP request."""
+
+    def __init__(self, app: ASGIApp, registry: RouteRegistry = route_metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats(route_of(scope))
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            self.registry.get(scope["method"], stats.route).record(status, elapsed, stats)
+
+
+class ProfilingMiddleware:
+    """Profiles the requests carrying the PROFILE_TOKEN in an X-Profile-Token header, and a PROFILE_SAMPLE_RATES
+    fraction of the requests to each listed route, into a folded stacks file in PROFILE_DIR.
+
+    The file name is returned in an X-Profile header. Settings are read on the first request.
+    """
+
+    def __init__(self, app: ASGIApp, token: Optional[str] = None, sample_rates: Optional[Dict[str, float]] = None,
+                 directory: Optional[str] = None, interval: Optional[float] = None):
+        self.app = app
+        self.token = token
+        self.sample_rates = sample_rates
+        self.directory = directory
+        self.interval = interval
+        self._configured = False
+
+    def _configure(self):
+        settings = get_settings()
+        if self.token is None:
+            self.token = settings.PROFILE_TOKEN
+        if self.sample_rates is None:
+            self.sample_rates = parse_sample_rates(settings.PROFILE_SAMPLE_RATES)
+        if self.directory is None:
+            self.directory = settings.PROFILE_DIR
+        if self.interval is None:
+            self.interval = settings.PROFILE_INTERVAL_MS / 1000
+        self._configured = True
+
+    def profiled_route(self, scope: Scope) -> Optional[str]:
+        """The name of the profile to take for ``scope``, or None to serve it unprofiled."""
+        requested = self.token and hmac.compare_digest(
+            dict(scope["headers"]).get(PROFILE_TOKEN_HEADER, b""), self.token.encode())
+        if not requested and not self.sample_rates:
+            return None
+        route = match_route(scope)
+        if not requested:
+            rate = self.sample_rates.get(route.path, self.sample_rates.get(route.name)) if route else None
+            if not rate or random.random() >= rate:
+                return None
+        return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not self._configured:
+            self._configure()
+
+        name = self.profiled_route(scope)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        if threading.current_thread() is not threading.main_thread():
+            logger.warning("Not profiling %s, requests are not served from the main thread", name)
+            await self.app(scope, receive, send)
+            return
+
+        file_name = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid4().hex[:8]}.folded"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_HEADER, file_name.encode())]
+            await send(message)
+
+        profile = Profile(name, self.interval)
+        token = current_profile.set(profile)
+        sampler.start(self.interval)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            current_profile.reset(token)
+            await run_in_threadpool(self.write, file_name, profile)
+
+    def write(self, file_name: str, profile: Profile):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, file_name), "w") as file:
+                file.write(profile.folded())
+        except OSError:
+            logger.exception("Unable to write profile %s", file_name)
@@ -1,9 +1,17 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float
+from sqlalchemy import DDL, Column, Computed, Integer, String, DateTime, Enum, FetchedValue, ForeignKey, Float, Index, \
+    event
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+from sqlalchemy.orm import deferred, relationship, declarative_base
+
+from app.core.config.settings import get_settings
+from app.core.schemas.task_assignment_schemas import Status
+
+# Text search configuration of jobs.search_vector; queries must use the same one to hit the GIN index.
+SEARCH_CONFIG = "simple"
 
 Base = declarative_base()
 
@@ -18,18 +26,34 @@ class Inspector(Base):
     last_update = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
     assignments = relationship("TaskAssignment", back_populates="inspector")
 
+    __table_args__ = (
+        Index("ix_inspectors_created_at_id", "created_at", "id"),
+        Index("ix_inspectors_last_update", "last_update"),
+    )
+
 
 class Task(Base):
     __tablename__ = "jobs"
     id = Column(postgresql.UUID(as_uuid=True), primary_key=True, index=True, unique=True)
     title = Column(String(100), index=True)
     description = Column(String(500))
-    deadline = Column(DateTime(timezone=True), nullable=True)
-    location = Column(String(100))
+    deadline = Column(DateTime(timezone=True), nullable=True, index=True)
+    location = Column(String(100), index=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     last_update = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Generated by Postgres on every write; deferred so regular task queries do not load it.
+    search_vector = deferred(Column(postgresql.TSVECTOR, Computed(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(location, '')), 'B') || "
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')", persisted=True)))
     assignments = relationship("TaskAssignment", back_populates="task")
 
+    __table_args__ = (
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_last_update", "last_update"),
+        Index("ix_jobs_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
 
 class TaskAssignment(Base):
     __tablename__ = "task_assignments"
@@ -37,7 +61,11 @@ class TaskAssignment(Base):
     inspector_id = Column(postgresql.UUID(as_uuid=True), ForeignKey("inspectors.id"))
     task_id = Column(postgresql.UUID(as_uuid=True), ForeignKey("jobs.id"), unique=True)
     scheduled_datetime = Column(DateTime(timezone=True))
-    status = Column(String(10))
+    # Filled by a trigger from scheduled_datetime, since timestamptz arithmetic cannot be a generated column.
+    scheduled_slot = Column(postgresql.TSTZRANGE, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    # Postgres enums sort in declaration order, so "unfinished" is the range status < 'completed'.
+    status = Column(Enum(Status, name="assignment_status", values_callable=lambda enum: [e.value for e in enum]),
+                    nullable=False, default=Status.pending)
     evaluation_datetime = Column(DateTime(timezone=True))
     rating = Column(Float)
     rating_description = Column(String(500))
@@ -45,3 +73,64 @@ class TaskAssignment(Base):
     last_update = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
     inspector = relationship("Inspector", back_populates="assignments")
     task = relationship("Task", back_populates="assignments")
+
+    __table_args__ = (
+        Index("ix_task_assignments_created_at_id", "created_at", "id"),
+        Index("ix_task_assignments_inspector_id_created_at_id", "inspector_id", "created_at", "id",
+              postgresql_include=["last_update"]),
+        Index("ix_task_assignments_inspector_id_status", "inspector_id", "status", "created_at", "id",
+              postgresql_include=["last_update"]),
+        Index("ix_task_assignments_inspector_id_last_update", "inspector_id", "last_update"),
+        Index("ix_task_assignments_last_update", "last_update"),
+        # GiST index that rejects overlapping slots for the same inspector.
+        ExcludeConstraint(("inspector_id", "="), ("scheduled_slot", "&&"),
+                          name="ex_task_assignments_inspector_id_scheduled_slot", using="gist"),
+    )
+
+
+event.listen(TaskAssignment.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+SCHEDULED_SLOT_TRIGGER = """
+CREATE OR REPLACE FUNCTION set_task_assignment_scheduled_slot() RETURNS trigger AS $$
+BEGIN
+    NEW.scheduled_slot := CASE WHEN NEW.scheduled_datetime IS NOT NULL THEN tstzrange(
+        NEW.scheduled_datetime, NEW.scheduled_datetime + interval '{minutes} minutes') END;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER task_assignments_scheduled_slot
+    BEFORE INSERT OR UPDATE OF scheduled_datetime ON task_assignments
+    FOR EACH ROW EXECUTE FUNCTION set_task_assignment_scheduled_slot();
+"""
+
+
+@event.listens_for(TaskAssignment.__table__, "after_create")
+def create_scheduled_slot_trigger(target, connection, **kw):
+    connection.execute(DDL(SCHEDULED_SLOT_TRIGGER.format(minutes=get_settings().ASSIGNMENT_SLOT_MINUTES)))
+
+
+class InspectorRatingStats(Base):
+    """Running rating aggregates of an inspector, kept up to date by finish_task."""
+    __tablename__ = "inspector_rating_stats"
+    inspector_id = Column(postgresql.UUID(as_uuid=True), ForeignKey("inspectors.id", ondelete="CASCADE"),
+                          primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Float, nullable=False, default=0)
+    rating_sum_squares = Column(Float, nullable=False, default=0)
+    recent_ratings = Column(postgresql.ARRAY(Float), nullable=False, default=list)
+    histogram = Column(postgresql.ARRAY(Integer), nullable=False)
+    last_update = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DeletedRecord(Base):
+    """Tombstone left behind by a delete so incremental syncs can propagate it."""
+    __tablename__ = "deleted_records"
+    id = Column(postgresql.UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    table_name = Column(String(50), nullable=False)
+    record_id = Column(postgresql.UUID(as_uuid=True), nullable=False)
+    inspector_id = Column(postgresql.UUID(as_uuid=True))
+    deleted_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_deleted_records_inspector_id_deleted_at", "inspector_id", "deleted_at"),
+    )
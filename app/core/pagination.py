@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+Cursor = Tuple[datetime, UUID]
+SearchCursor = Tuple[float, UUID]
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def encode_search_cursor(rank: float, id: UUID) -> str:
+    raw = json.dumps([rank, str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_search_cursor(cursor: str) -> SearchCursor:
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), UUID(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+
+
+def keyset(statement: Select, model, limit: int, after: Optional[Cursor] = None) -> Select:
+    """Orders ``statement`` on the (created_at, id) index and fetches one extra row to detect a next page."""
+    if after is not None:
+        statement = statement.where(tuple_(model.created_at, model.id) > tuple_(*after))
+    return statement.order_by(model.created_at, model.id).limit(limit + 1)
+
+
+def page(rows: List[Any], limit: int) -> Dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def search_page(rows: List[Any], limit: int) -> Dict:
+    """Like ``page`` for (rank, id) ordered rows of (item, rank)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1].rank, rows[-1][0].id)
+    return {"items": [row[0] for row in rows], "next_cursor": next_cursor}
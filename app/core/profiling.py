@@ -0,0 +1,117 @@
+import logging
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+import greenlet
+
+logger = logging.getLogger(__name__)
+
+APP_PACKAGE = "app."
+SQL_FRAME_LENGTH = 200
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parses ``"route=rate,..."``, where route is a path template or an endpoint name."""
+    rates = {}
+    for item in filter(None, (item.strip() for item in value.split(","))):
+        route, _, rate = item.rpartition("=")
+        rates[route.strip()] = float(rate)
+    return rates
+
+
+def frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def stack_of(frame) -> List:
+    """Frames from the outermost to ``frame``, continuing into the parents of the current greenlet."""
+    frames, current = [], greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return frames[::-1]
+        frame = current.gr_frame
+
+
+class Profile:
+    """Stack samples of one request in the folded format read by flamegraph.pl and speedscope.
+
+    CPU samples are taken every ``interval`` seconds. SQL statements appear as leaf frames under the app code
+    that issued them, weighted by their execution time in the same unit.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.samples: Counter = Counter()
+
+    def add(self, stack: Tuple[str, ...], weight: int = 1):
+        self.samples[(self.name,) + stack] += weight
+
+    def add_frame(self, frame):
+        self.add(tuple(frame_label(frame) for frame in stack_of(frame)))
+
+    def add_statement(self, frame, statement: str, seconds: float):
+        frames = stack_of(frame)
+        app_frames = [index for index, frame in enumerate(frames)
+                      if frame.f_globals.get("__name__", "").startswith(APP_PACKAGE)]
+        frames = frames[:app_frames[-1] + 1] if app_frames else frames
+        sql = " ".join(statement.split()).replace(";", ",")[:SQL_FRAME_LENGTH]
+        self.add(tuple(frame_label(frame) for frame in frames) + (f"SQL {sql}",),
+                 max(1, round(seconds / self.interval)))
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+current_profile: ContextVar[Optional[Profile]] = ContextVar("current_profile", default=None)
+
+
+class Sampler:
+    """Process-wide SIGPROF timer, armed only while at least one profiled request is running.
+
+    The signal handler runs in the main thread, in the context of whatever task is running there, so samples are
+    only kept for the request whose context carries a profile.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._previous_handler = None
+        self._lock = threading.Lock()
+
+    def start(self, interval: float):
+        with self._lock:
+            if self._active == 0:
+                self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+                signal.setitimer(signal.ITIMER_PROF, interval, interval)
+            self._active += 1
+
+    def stop(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    @staticmethod
+    def _sample(signum, frame):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.add_frame(frame)
+
+
+sampler = Sampler()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_statement(sys._getframe(), statement, time.perf_counter() - context._query_started)
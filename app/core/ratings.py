@@ -0,0 +1,93 @@
+from bisect import bisect_right
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import Float, Integer, bindparam, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.elements import TextClause
+
+RATING_BUCKET_BOUNDS = (1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0)
+RECENT_RATINGS_SIZE = 20
+
+
+def bucket_of(rating: float) -> int:
+    """Histogram slot of ``rating``; matches Postgres ``width_bucket(rating, bounds)``."""
+    return bisect_right(RATING_BUCKET_BOUNDS, rating)
+
+
+def record_rating(inspector_id: UUID, rating: Optional[float], previous_rating: Optional[float] = None) \
+        -> Optional[TextClause]:
+    """Upsert applying a new rating to the inspector's aggregates, retracting the one it replaces if any."""
+    if rating is None and previous_rating is None:
+        return None
+    histogram = [0] * (len(RATING_BUCKET_BOUNDS) + 1)
+    if rating is not None:
+        histogram[bucket_of(rating)] += 1
+    if previous_rating is not None:
+        histogram[bucket_of(previous_rating)] -= 1
+    new, old = rating or 0.0, previous_rating or 0.0
+
+    assignments = [
+        "rating_count = inspector_rating_stats.rating_count + :count_delta",
+        "rating_sum = inspector_rating_stats.rating_sum + :sum_delta",
+        "rating_sum_squares = inspector_rating_stats.rating_sum_squares + :sum_squares_delta",
+        "last_update = now()",
+    ]
+    if rating is not None:
+        assignments.append(f"recent_ratings = (ARRAY[CAST(:rating AS float8)] || inspector_rating_stats.recent_ratings)"
+                           f"[1:{RECENT_RATINGS_SIZE}]")
+    # Only the buckets that changed are assigned, each relative to its current count.
+    assignments.extend(f"histogram[{bucket + 1}] = inspector_rating_stats.histogram[{bucket + 1}] + {delta}"
+                       for bucket, delta in enumerate(histogram) if delta)
+
+    return text(f"""
+        INSERT INTO inspector_rating_stats (inspector_id, rating_count, rating_sum, rating_sum_squares,
+                                            recent_ratings, histogram, last_update)
+        VALUES (:inspector_id, :count, :rating, :rating_squared, :recent_ratings, :histogram, now())
+        ON CONFLICT (inspector_id) DO UPDATE SET {", ".join(assignments)}
+    """).bindparams(
+        bindparam("inspector_id", inspector_id, type_=postgresql.UUID(as_uuid=True)),
+        bindparam("count", int(rating is not None), type_=Integer),
+        bindparam("rating", new, type_=Float),
+        bindparam("rating_squared", new * new, type_=Float),
+        bindparam("recent_ratings", [rating] if rating is not None else [], type_=postgresql.ARRAY(Float)),
+        bindparam("histogram", [max(delta, 0) for delta in histogram], type_=postgresql.ARRAY(Integer)),
+        bindparam("count_delta", int(rating is not None) - int(previous_rating is not None), type_=Integer),
+        bindparam("sum_delta", new - old, type_=Float),
+        bindparam("sum_squares_delta", new * new - old * old, type_=Float),
+    )
+
+
+def rebuild_rating_stats() -> TextClause:
+    """Recomputes every inspector's aggregates from the completed assignments."""
+    buckets = ", ".join(f"count(*) FILTER (WHERE width_bucket(rating, :bounds) = {bucket})"
+                        for bucket in range(len(RATING_BUCKET_BOUNDS) + 1))
+    return text(f"""
+        INSERT INTO inspector_rating_stats (inspector_id, rating_count, rating_sum, rating_sum_squares,
+                                            recent_ratings, histogram, last_update)
+        SELECT inspector_id, count(*), sum(rating), sum(rating * rating),
+               (array_agg(rating ORDER BY evaluation_datetime DESC NULLS LAST, last_update DESC))
+                   [1:{RECENT_RATINGS_SIZE}],
+               ARRAY[{buckets}], now()
+        FROM task_assignments
+        WHERE status = 'completed' AND rating IS NOT NULL AND inspector_id IS NOT NULL
+        GROUP BY inspector_id
+    """).bindparams(bindparam("bounds", list(RATING_BUCKET_BOUNDS), type_=postgresql.ARRAY(Float)))
+
+
+def summarize(inspector_id: UUID, stats) -> Dict:
+    """Turns a stats row, or None when the inspector has no ratings yet, into the RatingStats payload."""
+    count = stats.rating_count if stats is not None else 0
+    mean = stats.rating_sum / count if count else None
+    variance = max(stats.rating_sum_squares / count - mean * mean, 0.0) if count else None
+    histogram: List[int] = stats.histogram if stats is not None else [0] * (len(RATING_BUCKET_BOUNDS) + 1)
+    bounds = (None,) + RATING_BUCKET_BOUNDS + (None,)
+    return {
+        "inspector_id": inspector_id,
+        "count": count,
+        "mean": mean,
+        "variance": variance,
+        "recent_ratings": stats.recent_ratings if stats is not None else [],
+        "histogram": [{"lower": bounds[bucket], "upper": bounds[bucket + 1], "count": bucket_count}
+                      for bucket, bucket_count in enumerate(histogram)],
+    }
@@ -0,0 +1,86 @@
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.core.schemas.inspector_schemas import Timezone
+
+TIMEZONES: Dict[str, str] = {
+    Timezone.madrid.value: "Europe/Madrid",
+    Timezone.mexico_city.value: "America/Mexico_City",
+    Timezone.uk.value: "Europe/London",
+}
+GROUPS: List[str] = list(TIMEZONES)
+NO_GROUP = -1
+
+
+def day_starts(day: date, start_hour: int) -> Dict[str, datetime]:
+    """Start of the working day in each inspector timezone."""
+    return {name: datetime.combine(day, time(start_hour), tzinfo=ZoneInfo(zone)) for name, zone in TIMEZONES.items()}
+
+
+def group_of(value: Optional[str]) -> int:
+    """Index of the timezone a task location or inspector timezone belongs to."""
+    for group, name in enumerate(GROUPS):
+        if value is not None and value.strip().lower() == name.lower():
+            return group
+    return NO_GROUP
+
+
+def timestamps(values: Sequence[Optional[datetime]]) -> np.ndarray:
+    """Epoch seconds, with missing datetimes mapped to +inf so they never constrain a match."""
+    return np.fromiter((value.timestamp() if value is not None else np.inf for value in values),
+                       dtype=np.float64, count=len(values))
+
+
+def build_slots(groups: np.ndarray, first_slots: np.ndarray, starts: np.ndarray, capacity: int,
+                slot_seconds: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Expands every inspector's free slots of the day into (inspector index, slot start) arrays.
+
+    ``first_slots`` is the first free slot of each inspector and ``starts`` the epoch start of the working day
+    of each timezone group.
+    """
+    free = np.clip(capacity - first_slots, 0, None)
+    owners = np.repeat(np.arange(len(groups)), free)
+    positions = np.arange(len(owners)) - np.repeat(np.cumsum(free) - free, free)
+    times = starts[groups[owners]] + (first_slots[owners] + positions) * slot_seconds
+    return owners, times
+
+
+def match_by_deadline(deadlines: np.ndarray, slot_times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Maximum matching of tasks to slots that start before their deadline, earliest deadline first.
+
+    Tasks taken in deadline order each get the earliest free slot. Since every task can use a prefix of the
+    sorted slots, the number of slots usable by the j-th task (``reachable``) is non-decreasing and the running
+    match count follows ``m[j] = min(m[j - 1] + 1, reachable[j])``, which unrolls into a cumulative minimum.
+    Returns the matched task and slot indices.
+    """
+    task_order = np.argsort(deadlines, kind="stable")
+    slot_order = np.argsort(slot_times, kind="stable")
+    reachable = np.searchsorted(slot_times[slot_order], deadlines[task_order], side="right")
+    steps = np.arange(len(task_order))
+    matched_count = np.minimum(steps + 1, steps + np.minimum.accumulate(reachable - steps))
+    matched = np.diff(matched_count, prepend=0) > 0
+    return task_order[matched], slot_order[matched_count[matched] - 1]
+
+
+def plan(task_deadlines: np.ndarray, task_groups: np.ndarray, slot_times: np.ndarray, slot_groups: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """Matches tasks to inspectors of their own timezone first and spills the rest over any free slot."""
+    task_slots = np.full(len(task_deadlines), -1)
+    slot_taken = np.zeros(len(slot_times), dtype=bool)
+    for group in range(len(GROUPS)):
+        tasks = np.flatnonzero(task_groups == group)
+        slots = np.flatnonzero(slot_groups == group)
+        matched_tasks, matched_slots = match_by_deadline(task_deadlines[tasks], slot_times[slots])
+        task_slots[tasks[matched_tasks]] = slots[matched_slots]
+        slot_taken[slots[matched_slots]] = True
+
+    tasks = np.flatnonzero(task_slots < 0)
+    slots = np.flatnonzero(~slot_taken)
+    matched_tasks, matched_slots = match_by_deadline(task_deadlines[tasks], slot_times[slots])
+    task_slots[tasks[matched_tasks]] = slots[matched_slots]
+
+    assigned = np.flatnonzero(task_slots >= 0)
+    return assigned, task_slots[assigned]
@@ -1,8 +1,8 @@
 import uuid
 from enum import Enum
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, constr
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -13,8 +13,8 @@ class Timezone(str, Enum):
 
 
 class InspectorBase(BaseModel):
-    name: str
-    email: Optional[str] = None
+    name: constr(max_length=50)
+    email: Optional[constr(max_length=50)] = None
     timezone: Timezone
 
 
@@ -34,3 +34,18 @@ class Inspector(InspectorBase):
     class Config:
         orm_mode = True
         arbitrary_types_allowed = True
+
+
+class RatingBucket(BaseModel):
+    lower: Optional[float]
+    upper: Optional[float]
+    count: int
+
+
+class RatingStats(BaseModel):
+    inspector_id: uuid.UUID
+    count: int
+    mean: Optional[float]
+    variance: Optional[float]
+    recent_ratings: List[float]
+    histogram: List[RatingBucket]
@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.core.schemas.inspector_schemas import RatingBucket
+
+
+class OnTimeReport(BaseModel):
+    completed: int
+    with_deadline: int
+    on_time: int
+    on_time_rate: Optional[float]
+
+
+class LatenessReport(BaseModel):
+    late: int
+    average_lateness_seconds: Optional[float]
+    average_lateness_of_late_seconds: Optional[float]
+    max_lateness_seconds: Optional[float]
+
+
+class TimezoneThroughput(BaseModel):
+    timezone: Optional[str]
+    completed: int
+    per_day: Optional[float]
+
+
+class RatingDistribution(BaseModel):
+    count: int
+    mean: Optional[float]
+    p50: Optional[float]
+    p90: Optional[float]
+    histogram: List[RatingBucket]
@@ -1,10 +1,12 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
 
+from app.core.schemas.task_schemas import Task
+
 
 class Status(str, Enum):
     pending = 'pending'
@@ -25,6 +27,11 @@ class TaskAssignmentUpdate(TaskAssignmentBase):
     pass
 
 
+class TaskAssignmentBulkCreate(TaskAssignmentCreate):
+    inspector_id: UUID
+    task_id: UUID
+
+
 class TaskAssignmentEvaluation(BaseModel):
     rating: float = None
     rating_description: Optional[str] = None
@@ -53,3 +60,28 @@ class TaskAssignmentEvaluationOut(TaskAssignmentEvaluation):
 
     class Config:
         orm_mode = True
+
+
+class Tombstone(BaseModel):
+    id: UUID
+    deleted_at: datetime
+
+
+class InspectorChanges(BaseModel):
+    assignments: List[TaskAssignment]
+    tasks: List[Task]
+    deleted: List[Tombstone]
+    watermark: Optional[datetime]
+
+
+class ScheduledAssignment(BaseModel):
+    task_id: UUID
+    inspector_id: UUID
+    scheduled_datetime: datetime
+
+
+class ScheduleResult(BaseModel):
+    dry_run: bool
+    assigned: int
+    unassigned: int
+    items: List[ScheduledAssignment]
@@ -2,14 +2,14 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, constr
 
 
 class TaskBase(BaseModel):
-    title: str
-    description: Optional[str] = None
+    title: constr(max_length=100)
+    description: Optional[constr(max_length=500)] = None
     deadline: datetime
-    location: str
+    location: constr(max_length=100)
 
 
 class TaskCreate(TaskBase):
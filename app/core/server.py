@@ -0,0 +1,57 @@
+import logging
+import os
+from typing import Dict
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.core.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class UvloopWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop and httptools instead of falling back to asyncio and h11."""
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+def worker_count(settings: Settings) -> int:
+    if settings.WEB_CONCURRENCY > 0:
+        return settings.WEB_CONCURRENCY
+    # Respects CPU affinity limits set on the container, unlike os.cpu_count().
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def server_options(settings: Settings) -> Dict:
+    return {
+        "bind": f"{settings.HOST}:{settings.PORT}",
+        "workers": worker_count(settings),
+        "worker_class": f"{UvloopWorker.__module__}.{UvloopWorker.__name__}",
+        # The app is imported once in the master so workers fork with it loaded; no connections are open yet.
+        "preload_app": True,
+        "max_requests": settings.MAX_REQUESTS,
+        "max_requests_jitter": settings.MAX_REQUESTS_JITTER,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT,
+        "keepalive": settings.KEEPALIVE_SECONDS,
+        "loglevel": (settings.LOG_LEVEL or "info").lower(),
+        "accesslog": "-",
+    }
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn master supervising uvicorn workers, configured from Settings."""
+
+    def __init__(self, app_uri: str, settings: Settings):
+        self.app_uri = app_uri
+        self.options = server_options(settings)
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        module, name = self.app_uri.split(":")
+        app = getattr(__import__(module, fromlist=[name]), name)
+        logger.info("Loaded %s, starting %s workers", self.app_uri, self.options["workers"])
+        return app
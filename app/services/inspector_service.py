@@ -1,10 +1,19 @@
 import uuid
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Union
 from uuid import UUID
 
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.bulk import bulk_result, chunked, validate_rows
+from app.core.cache import LRUCache, publish_invalidation
+from app.core.export import EXPORT_BATCH_SIZE, stream_batches
 from app.core.models import models
+from app.core.pagination import DEFAULT_PAGE_SIZE, Cursor, keyset, page
+from app.core.ratings import rebuild_rating_stats, summarize
 from app.core.schemas import inspector_schemas as schemas
 
 
@@ -18,7 +27,6 @@ class InspectorService:
             db_inspector.id = uuid.uuid4()
             self.db.add(db_inspector)
             self.db.commit()
-            self.db.refresh(db_inspector)
             return db_inspector
         except Exception as e:
             self.db.rollback()
@@ -31,26 +39,140 @@ class InspectorService:
     def get_inspectors(self) -> List[models.Inspector]:
         return self.db.query(models.Inspector).all()
 
-    def update_inspector(self, inspector_id: UUID, inspector: schemas.InspectorUpdate) -> models.Inspector:
+    def update_inspector(self, inspector_id: UUID, inspector: schemas.InspectorUpdate) -> Row:
         try:
-            db_inspector = self.get_inspector(inspector_id)
+            table = models.Inspector.__table__
             update_data = inspector.dict(exclude_unset=True)
-            for key, value in update_data.items():
-                setattr(db_inspector, key, value)
+            result = self.db.execute(update(table).where(table.c.id == inspector_id).values(**update_data)
+                                     .returning(*table.c))
+            db_inspector = result.first()
+            if not db_inspector:
+                raise ValueError("Inspector not found.")
             self.db.commit()
-            self.db.refresh(db_inspector)
+            return db_inspector
         except Exception as e:
             self.db.rollback()
             raise e
-        return db_inspector
 
     def delete_inspector(self, inspector_id: UUID):
         try:
-            db_inspector = self.get_inspector(inspector_id)
-            self.db.delete(db_inspector)
+            table = models.Inspector.__table__
+            result = self.db.execute(delete(table).where(table.c.id == inspector_id).returning(table.c.id))
+            if not result.first():
+                raise ValueError("Inspector not found.")
             self.db.commit()
+            return
         except Exception as e:
             self.db.rollback()
             raise e
-        return
 
+    def rebuild_rating_stats(self) -> int:
+        try:
+            self.db.execute(delete(models.InspectorRatingStats))
+            result = self.db.execute(rebuild_rating_stats())
+            self.db.commit()
+            return result.rowcount
+        except Exception as e:
+            self.db.rollback()
+            raise e
+
+
+class AsyncInspectorService:
+    def __init__(self, db: AsyncSession, cache: Optional[LRUCache] = None):
+        self.db = db
+        self.cache = cache
+
+    async def create_inspector(self, inspector: schemas.InspectorCreate) -> models.Inspector:
+        try:
+            db_inspector = models.Inspector(**inspector.dict())
+            db_inspector.id = uuid.uuid4()
+            self.db.add(db_inspector)
+            await self.db.commit()
+            return db_inspector
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def create_inspectors(self, inspectors: List[Dict[str, Any]]) -> Dict:
+        valid, results = validate_rows(inspectors, schemas.InspectorCreate)
+        try:
+            for batch in chunked(valid):
+                values = [dict(inspector.dict(), id=uuid.uuid4()) for _, inspector in batch]
+                statement = postgresql.insert(models.Inspector).values(values) \
+                    .on_conflict_do_nothing(index_elements=[models.Inspector.email]) \
+                    .returning(models.Inspector.id)
+                inserted = set((await self.db.execute(statement)).scalars().all())
+                for (index, _), value in zip(batch, values):
+                    if value["id"] in inserted:
+                        results.append({"index": index, "id": value["id"]})
+                    else:
+                        results.append({"index": index, "error": "Email already registered."})
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+        return bulk_result(results)
+
+    async def get_inspector(self, inspector_id: UUID) -> Union[models.Inspector, schemas.Inspector]:
+        if self.cache is not None:
+            inspector = self.cache.get(inspector_id)
+            if inspector is not None:
+                return inspector
+        result = await self.db.execute(select(models.Inspector).where(models.Inspector.id == inspector_id))
+        inspector = result.scalars().first()
+        if inspector is not None and self.cache is not None:
+            inspector = schemas.Inspector.from_orm(inspector)
+            self.cache.set(inspector_id, inspector)
+        return inspector
+
+    async def get_rating_stats(self, inspector_id: UUID) -> Dict:
+        result = await self.db.execute(
+            select(models.Inspector.id, models.InspectorRatingStats)
+            .outerjoin(models.InspectorRatingStats, models.InspectorRatingStats.inspector_id == models.Inspector.id)
+            .where(models.Inspector.id == inspector_id))
+        row = result.first()
+        if not row:
+            raise ValueError("Inspector not found.")
+        return summarize(inspector_id, row.InspectorRatingStats)
+
+    async def get_inspectors(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[Cursor] = None) -> Dict:
+        result = await self.db.execute(keyset(select(models.Inspector), models.Inspector, limit, after))
+        return page(result.scalars().all(), limit)
+
+    def stream_inspectors(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Mapping]]:
+        return stream_batches(self.db, select(models.Inspector.__table__), batch_size)
+
+    async def update_inspector(self, inspector_id: UUID, inspector: schemas.InspectorUpdate) -> Row:
+        try:
+            table = models.Inspector.__table__
+            update_data = inspector.dict(exclude_unset=True)
+            result = await self.db.execute(update(table).where(table.c.id == inspector_id).values(**update_data)
+                                           .returning(*table.c))
+            db_inspector = result.first()
+            if not db_inspector:
+                raise ValueError("Inspector not found.")
+            if self.cache is not None:
+                await publish_invalidation(self.db, self.cache, inspector_id)
+            await self.db.commit()
+            if self.cache is not None:
+                self.cache.invalidate(inspector_id)
+            return db_inspector
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def delete_inspector(self, inspector_id: UUID):
+        try:
+            table = models.Inspector.__table__
+            result = await self.db.execute(delete(table).where(table.c.id == inspector_id).returning(table.c.id))
+            if not result.first():
+                raise ValueError("Inspector not found.")
+            if self.cache is not None:
+                await publish_invalidation(self.db, self.cache, inspector_id)
+            await self.db.commit()
+            if self.cache is not None:
+                self.cache.invalidate(inspector_id)
+            return
+        except Exception as e:
+            await self.db.rollback()
+            raise e
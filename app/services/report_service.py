@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import analytics
+from app.core.analytics import AssignmentSnapshot
+from app.core.config.settings import get_settings
+
+
+class AsyncReportService:
+    def __init__(self, db: AsyncSession, snapshot: Optional[AssignmentSnapshot] = None):
+        self.db = db
+        self.snapshot = snapshot
+
+    async def get_on_time(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        return analytics.on_time_report(await self._columns(start, end))
+
+    async def get_lateness(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        return analytics.lateness_report(await self._columns(start, end))
+
+    async def get_throughput(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        columns = await self._columns(start, end)
+        scheduled = columns["scheduled"][~np.isnan(columns["scheduled"])]
+        if start is not None and end is not None:
+            days = (end - start).total_seconds() / 86400
+        elif scheduled.size:
+            days = (scheduled.max() - scheduled.min()) / 86400 + 1
+        else:
+            days = 0
+        return analytics.throughput_report(columns, days)
+
+    async def get_ratings(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict:
+        return analytics.rating_report(await self._columns(start, end))
+
+    async def _columns(self, start: Optional[datetime], end: Optional[datetime]) -> Dict[str, np.ndarray]:
+        refresh_seconds = get_settings().ANALYTICS_REFRESH_SECONDS
+        try:
+            snapshot = self.snapshot if self.snapshot is not None and refresh_seconds > 0 else AssignmentSnapshot()
+            await snapshot.refresh(self.db, refresh_seconds)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+        return snapshot.select(start, end)
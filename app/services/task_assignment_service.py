@@ -1,11 +1,107 @@
 import uuid
-from typing import List
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
 from uuid import UUID
 
+import numpy as np
+from sqlalchemy import Integer, Interval, case, cast, delete, func, insert, literal, or_, select, true, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core import scheduler
+from app.core.bulk import bulk_result, chunked, typed_array, validate_rows
+from app.core.config.settings import get_settings
+from app.core.events import assignment_event, publish_assignment_events
+from app.core.export import EXPORT_BATCH_SIZE, stream_batches
 from app.core.models import models
+from app.core.pagination import DEFAULT_PAGE_SIZE, Cursor, keyset, page
+from app.core.ratings import record_rating
 from app.core.schemas import task_assignment_schemas as schemas
+from app.services.task_service import UNASSIGNED
+
+EXPORT_COLUMNS = [column for column in models.TaskAssignment.__table__.c if column.key != "scheduled_slot"]
+
+EXCLUSION_VIOLATION = "23P01"
+
+
+def scheduled_slot(scheduled_datetime):
+    """Range an assignment starting at ``scheduled_datetime`` books its inspector for."""
+    return func.tstzrange(scheduled_datetime,
+                          scheduled_datetime + cast(timedelta(minutes=get_settings().ASSIGNMENT_SLOT_MINUTES),
+                                                    Interval))
+
+
+def as_utc(value: datetime) -> datetime:
+    """``value`` in UTC, reading a naive datetime as already being UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def is_booking_conflict(error: Exception) -> bool:
+    """Whether ``error`` is the exclusion constraint rejecting an overlapping slot for the same inspector."""
+    return isinstance(error, IntegrityError) and getattr(error.orig, "pgcode", None) == EXCLUSION_VIOLATION
+
+
+def delete_with_tombstone(task_assignment_id: UUID):
+    """Deletes an assignment and records its tombstone for the change feed in the same statement."""
+    table = models.TaskAssignment.__table__
+    tombstones = models.DeletedRecord.__table__
+    deleted = delete(table).where(table.c.id == task_assignment_id) \
+        .returning(table.c.id, table.c.inspector_id, table.c.status, table.c.rating).cte("deleted")
+    tombstone = insert(tombstones) \
+        .from_select(["id", "table_name", "record_id", "inspector_id", "deleted_at"],
+                     select(func.gen_random_uuid(), literal(table.name), deleted.c.id, deleted.c.inspector_id,
+                            func.now())) \
+        .returning(tombstones.c.record_id, tombstones.c.inspector_id).cte("tombstone")
+    return select(tombstone.c.record_id, tombstone.c.inspector_id, deleted.c.status, deleted.c.rating) \
+        .join_from(tombstone, deleted, tombstone.c.record_id == deleted.c.id)
+
+
+def update_with_previous_status(task_assignment_id: UUID, values: Dict[str, Any]):
+    """Updates an assignment returning its new columns plus the status it had, locked against concurrent updates."""
+    table = models.TaskAssignment.__table__
+    previous = select(table.c.id, table.c.status).where(table.c.id == task_assignment_id) \
+        .with_for_update().subquery("previous")
+    return update(table).where(table.c.id == previous.c.id).values(**values) \
+        .returning(*table.c, previous.c.status.label("previous_status"))
+
+
+def rating_change(inspector_id: UUID, rating: Optional[float], was_completed: bool, is_completed: bool):
+    """Aggregate upsert adding or retracting an assignment's rating when it enters or leaves the completed status."""
+    if rating is None or was_completed == is_completed:
+        return None
+    return record_rating(inspector_id, rating if is_completed else None, rating if was_completed else None)
+
+
+def claim_next_task(inspector_id: UUID, task_assignment: schemas.TaskAssignmentCreate, location: Optional[str] = None):
+    """Assigns the unassigned task with the earliest deadline, skipping rows locked by concurrent claims.
+
+    Returns the candidate task id with the inserted assignment columns, which are null when the candidate was
+    claimed by a transaction that committed after this statement's snapshot; no row means no task is available.
+    """
+    tasks = models.Task.__table__
+    table = models.TaskAssignment.__table__
+    candidate = select(tasks.c.id) \
+        .where(UNASSIGNED, or_(tasks.c.deadline.is_(None), tasks.c.deadline >= task_assignment.scheduled_datetime)) \
+        .order_by(tasks.c.deadline.asc().nulls_last(), tasks.c.id) \
+        .limit(1).with_for_update(skip_locked=True)
+    if location is not None:
+        candidate = candidate.where(tasks.c.location == location)
+    candidate = candidate.cte("candidate")
+    claimed = postgresql.insert(table) \
+        .from_select(["id", "inspector_id", "task_id", "scheduled_datetime", "status"],
+                     select(literal(uuid.uuid4(), table.c.id.type),
+                            literal(inspector_id, table.c.inspector_id.type),
+                            candidate.c.id,
+                            literal(task_assignment.scheduled_datetime, table.c.scheduled_datetime.type),
+                            literal(task_assignment.status, table.c.status.type))) \
+        .on_conflict_do_nothing(index_elements=[table.c.task_id]) \
+        .returning(*table.c).cte("claimed")
+    return select(candidate.c.id.label("candidate_id"), *claimed.c) \
+        .select_from(candidate.outerjoin(claimed, true()))
 
 
 class TaskAssignmentService:
@@ -31,37 +127,39 @@ class TaskAssignmentService:
 
             self.db.add(db_task_assignment)
             self.db.commit()
-            self.db.refresh(db_task_assignment)
             return db_task_assignment
         except Exception as e:
             self.db.rollback()
+            if is_booking_conflict(e):
+                raise ValueError("Inspector already booked at that time.") from e
             raise e
-        finally:
-            self.db.close()
 
     def finish_task(self, task_assignment_id: UUID, task_assignment: schemas.TaskAssignmentEvaluation) \
             -> models.Task:
         try:
-            db_task_assignment = self.get_assigned_task(task_assignment_id)
+            db_task_assignment = self.db.query(models.TaskAssignment) \
+                .filter(models.TaskAssignment.id == task_assignment_id).with_for_update().first()
             if not db_task_assignment:
                 raise ValueError("Assignation not found.")
             if task_assignment.evaluation_datetime > db_task_assignment.scheduled_datetime:
                 raise ValueError("Evaluation date is after schedule datetime.")
+            previous_rating = db_task_assignment.rating \
+                if db_task_assignment.status == schemas.Status.completed else None
 
             db_task_assignment.evaluation_datetime = task_assignment.evaluation_datetime
             db_task_assignment.rating = task_assignment.rating
             db_task_assignment.rating_description = task_assignment.rating_description
-            db_task_assignment.status = "completed"
+            db_task_assignment.status = schemas.Status.completed
 
             self.db.add(db_task_assignment)
+            rating_stats = record_rating(db_task_assignment.inspector_id, task_assignment.rating, previous_rating)
+            if rating_stats is not None:
+                self.db.execute(rating_stats)
             self.db.commit()
-            self.db.refresh(db_task_assignment)
             return db_task_assignment
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_assigned_task(self, task_assignment_id: UUID) -> models.TaskAssignment:
         try:
@@ -71,8 +169,6 @@ class TaskAssignmentService:
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_assigned_tasks(self) -> List[models.TaskAssignment]:
         try:
@@ -80,8 +176,6 @@ class TaskAssignmentService:
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_from_inspector(self, inspector_id: UUID) -> List[models.TaskAssignment]:
         try:
@@ -89,53 +183,454 @@ class TaskAssignmentService:
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_unfinished_from_inspector(self, inspector_id: UUID) -> List[models.TaskAssignment]:
         try:
             return self.db.query(models.TaskAssignment).filter(models.TaskAssignment.inspector_id == inspector_id) \
-                .filter(models.TaskAssignment.status == "pending").all()
+                .filter(models.TaskAssignment.status < schemas.Status.completed).all()
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_finished_from_inspector(self, inspector_id: UUID) -> List[models.TaskAssignment]:
         try:
             return self.db.query(models.TaskAssignment).filter(models.TaskAssignment.inspector_id == inspector_id) \
-                .filter(models.TaskAssignment.status == "completed").all()
+                .filter(models.TaskAssignment.status == schemas.Status.completed).all()
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def update_assigned_task(self, task_assignment_id: UUID,
-                             task_assignment: schemas.TaskAssignmentUpdate) -> models.Task:
+                             task_assignment: schemas.TaskAssignmentUpdate) -> Row:
         try:
-            db_task_assignment = self.get_assigned_task(task_assignment_id)
             update_data = task_assignment.dict(exclude_unset=True)
-            for key, value in update_data.items():
-                setattr(db_task_assignment, key, value)
+            result = self.db.execute(update_with_previous_status(task_assignment_id, update_data))
+            db_task_assignment = result.first()
+            if not db_task_assignment:
+                raise ValueError("Assignation not found.")
+            rating_stats = rating_change(db_task_assignment.inspector_id, db_task_assignment.rating,
+                                         db_task_assignment.previous_status == schemas.Status.completed,
+                                         db_task_assignment.status == schemas.Status.completed)
+            if rating_stats is not None:
+                self.db.execute(rating_stats)
             self.db.commit()
-            self.db.refresh(db_task_assignment)
             return db_task_assignment
         except Exception as e:
             self.db.rollback()
+            if is_booking_conflict(e):
+                raise ValueError("Inspector already booked at that time.") from e
             raise e
-        finally:
-            self.db.close()
 
     def delete_assigned_task(self, task_assignment_id: UUID):
         try:
-            db_assignment_task = self.get_assigned_task(task_assignment_id)
-            self.db.delete(db_assignment_task)
+            result = self.db.execute(delete_with_tombstone(task_assignment_id))
+            deleted = result.first()
+            if not deleted:
+                raise ValueError("Assignation not found.")
+            rating_stats = rating_change(deleted.inspector_id, deleted.rating,
+                                         deleted.status == schemas.Status.completed, False)
+            if rating_stats is not None:
+                self.db.execute(rating_stats)
             self.db.commit()
             return
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
+
+
+class AsyncTaskAssignmentService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def assign_task(self, inspector_id: UUID, task_id: UUID, task_assignment: schemas.TaskAssignmentCreate) \
+            -> models.TaskAssignment:
+        try:
+            inspector = await self.db.get(models.Inspector, inspector_id)
+            if not inspector:
+                raise ValueError("Inspector not found.")
+            task = await self.db.get(models.Task, task_id)
+            if not task:
+                raise ValueError("Task not found.")
+            if task_assignment.scheduled_datetime > task.deadline:
+                raise ValueError("Scheduled datetime is after deadline.")
+
+            db_task_assignment = models.TaskAssignment(**task_assignment.dict())
+            db_task_assignment.id = uuid.uuid4()
+            db_task_assignment.inspector_id = inspector.id
+            db_task_assignment.task_id = task.id
+
+            self.db.add(db_task_assignment)
+            await publish_assignment_events(self.db, [
+                assignment_event("created", db_task_assignment.inspector_id, db_task_assignment.id)])
+            await self.db.commit()
+            return db_task_assignment
+        except Exception as e:
+            await self.db.rollback()
+            if is_booking_conflict(e):
+                raise ValueError("Inspector already booked at that time.") from e
+            raise e
+
+    async def assign_tasks(self, task_assignments: List[Dict[str, Any]]) -> Dict:
+        valid, results = validate_rows(task_assignments, schemas.TaskAssignmentBulkCreate)
+        # Naive and aware datetimes can't be compared, so every requested slot is checked and stored in UTC.
+        valid = [(index, assignment.copy(update={"scheduled_datetime": as_utc(assignment.scheduled_datetime)}))
+                 for index, assignment in valid]
+        events = []
+        try:
+            for batch in chunked(valid):
+                rejected = await self._validate_assignments(batch)
+                results.extend({"index": index, "error": error} for index, error in rejected.items())
+                batch = [(index, assignment) for index, assignment in batch if index not in rejected]
+                if not batch:
+                    continue
+
+                values = [dict(assignment.dict(), id=uuid.uuid4()) for _, assignment in batch]
+                skipped = await self._insert_assignments(values)
+                for (index, _), value in zip(batch, values):
+                    if value["id"] in skipped:
+                        results.append({"index": index, "error": skipped[value["id"]]})
+                    else:
+                        results.append({"index": index, "id": value["id"]})
+                        events.append(assignment_event("created", value["inspector_id"], value["id"]))
+            await publish_assignment_events(self.db, events)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+        return bulk_result(results)
+
+    async def claim_next(self, inspector_id: UUID, task_assignment: schemas.TaskAssignmentCreate,
+                         location: Optional[str] = None) -> Row:
+        try:
+            inspector = await self.db.get(models.Inspector, inspector_id)
+            if not inspector:
+                raise ValueError("Inspector not found.")
+            # The job row lock doesn't cover the assignment a concurrent claim may have committed meanwhile; each
+            # retry takes a new snapshot that sees it and moves on to the next task.
+            while True:
+                result = await self.db.execute(claim_next_task(inspector_id, task_assignment, location))
+                db_task_assignment = result.first()
+                if not db_task_assignment:
+                    raise ValueError("No task available.")
+                if db_task_assignment.id is not None:
+                    break
+            await publish_assignment_events(self.db, [
+                assignment_event("created", db_task_assignment.inspector_id, db_task_assignment.id)])
+            await self.db.commit()
+            return db_task_assignment
+        except Exception as e:
+            await self.db.rollback()
+            if is_booking_conflict(e):
+                raise ValueError("Inspector already booked at that time.") from e
+            raise e
+
+    async def schedule(self, day: date, dry_run: bool = False) -> Dict:
+        """Assigns the open tasks to the inspectors' free slots of ``day`` and bulk inserts the plan.
+
+        Inspectors get ``SCHEDULER_INSPECTOR_CAPACITY`` slots from the start of their local working day,
+        after the last assignment they already have that day. Tasks go to inspectors of the timezone matching
+        their location first, and only to slots starting before their deadline.
+        """
+        settings = get_settings()
+        slot = timedelta(minutes=settings.ASSIGNMENT_SLOT_MINUTES)
+        starts = scheduler.day_starts(day, settings.SCHEDULER_WORKDAY_START_HOUR)
+        try:
+            inspectors = (await self.db.execute(self._inspector_slots(starts))).all()
+            tasks = (await self.db.execute(
+                select(models.Task.id, models.Task.deadline, models.Task.location)
+                .where(UNASSIGNED, or_(models.Task.deadline.is_(None),
+                                       models.Task.deadline >= min(starts.values()))))).all()
+
+            group_starts = scheduler.timestamps([starts[name] for name in scheduler.GROUPS])
+            inspector_groups = np.array([scheduler.group_of(row.timezone) for row in inspectors], dtype=np.int64)
+            last_scheduled = scheduler.timestamps([row.last_scheduled for row in inspectors])
+            first_slots = np.where(np.isinf(last_scheduled), 0, np.ceil(
+                (last_scheduled - group_starts[inspector_groups]) / slot.total_seconds() + 1)).astype(np.int64)
+            owners, slot_times = scheduler.build_slots(inspector_groups, first_slots, group_starts,
+                                                       settings.SCHEDULER_INSPECTOR_CAPACITY, slot.total_seconds())
+            assigned, slots = scheduler.plan(scheduler.timestamps([row.deadline for row in tasks]),
+                                             np.array([scheduler.group_of(row.location) for row in tasks],
+                                                      dtype=np.int64),
+                                             slot_times, inspector_groups[owners])
+
+            items = [{"task_id": tasks[task].id, "inspector_id": inspectors[owners[slot_index]].id,
+                      "scheduled_datetime": datetime.fromtimestamp(slot_times[slot_index], starts[
+                          inspectors[owners[slot_index]].timezone].tzinfo)}
+                     for task, slot_index in zip(assigned.tolist(), slots.tolist())]
+            if not dry_run:
+                items = await self._insert_scheduled(items)
+                await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+        return {"dry_run": dry_run, "assigned": len(items), "unassigned": len(tasks) - len(items), "items": items}
+
+    @staticmethod
+    def _inspector_slots(starts: Dict[str, datetime]):
+        scheduled = models.TaskAssignment.scheduled_datetime
+        day_start = case({name: cast(start, scheduled.type) for name, start in starts.items()},
+                         value=models.Inspector.timezone)
+        day_end = day_start + cast(timedelta(days=1), Interval)
+        return select(models.Inspector.id, models.Inspector.timezone,
+                      func.max(scheduled).filter(scheduled >= day_start, scheduled < day_end).label("last_scheduled")) \
+            .outerjoin(models.TaskAssignment, models.TaskAssignment.inspector_id == models.Inspector.id) \
+            .where(models.Inspector.timezone.in_(scheduler.GROUPS)) \
+            .group_by(models.Inspector.id) \
+            .order_by(models.Inspector.id)
+
+    async def _insert_scheduled(self, items: List[Dict]) -> List[Dict]:
+        """Inserts the planned assignments, dropping tasks claimed and slots booked concurrently since they were
+        read."""
+        inserted_items = []
+        for batch in chunked(items):
+            values = [dict(item, id=uuid.uuid4(), status=schemas.Status.pending) for item in batch]
+            skipped = await self._insert_assignments(values)
+            inserted_items.extend(item for item, value in zip(batch, values) if value["id"] not in skipped)
+            await publish_assignment_events(self.db, [assignment_event("created", value["inspector_id"], value["id"])
+                                                      for value in values if value["id"] not in skipped])
+        return inserted_items
+
+    async def _insert_assignments(self, values: List[Dict]) -> Dict[UUID, str]:
+        """Inserts ``values``, skipping those that conflict with assignments committed after they were validated.
+
+        Returns the error of each skipped assignment by id.
+        """
+        statement = postgresql.insert(models.TaskAssignment).values(values).on_conflict_do_nothing() \
+            .returning(models.TaskAssignment.id)
+        inserted = set((await self.db.execute(statement)).scalars().all())
+        skipped = [value for value in values if value["id"] not in inserted]
+        if not skipped:
+            return {}
+        # Without a conflict target both the task_id unique and the slot exclusion constraints skip rows.
+        assigned = set((await self.db.execute(
+            select(models.TaskAssignment.task_id)
+            .where(models.TaskAssignment.task_id.in_([value["task_id"] for value in skipped])))).scalars().all())
+        return {value["id"]: "Task already assigned." if value["task_id"] in assigned
+                else "Inspector already booked at that time." for value in skipped}
+
+    async def _validate_assignments(self, batch) -> Dict[int, str]:
+        """Checks inspectors, tasks, deadlines, existing assignments and bookings for the whole batch in one query."""
+        uuid_type = postgresql.UUID(as_uuid=True)
+        table = models.TaskAssignment.__table__
+        bookings = table.alias("bookings")
+        requested = func.unnest(typed_array([index for index, _ in batch], Integer),
+                                typed_array([assignment.inspector_id for _, assignment in batch], uuid_type),
+                                typed_array([assignment.task_id for _, assignment in batch], uuid_type),
+                                typed_array([assignment.scheduled_datetime for _, assignment in batch],
+                                            table.c.scheduled_datetime.type)) \
+            .table_valued("position", "inspector_id", "task_id", "scheduled_datetime").render_derived(name="requested")
+        booked = select(bookings.c.id).where(bookings.c.inspector_id == requested.c.inspector_id,
+                                             bookings.c.scheduled_slot.op("&&")(
+                                                 scheduled_slot(requested.c.scheduled_datetime))).exists()
+        statement = select(requested.c.position,
+                           models.Inspector.id.isnot(None).label("inspector_found"),
+                           models.Task.id.isnot(None).label("task_found"),
+                           (requested.c.scheduled_datetime > models.Task.deadline).label("after_deadline"),
+                           models.TaskAssignment.id.isnot(None).label("assigned"),
+                           booked.label("booked")) \
+            .select_from(requested
+                         .outerjoin(models.Inspector, models.Inspector.id == requested.c.inspector_id)
+                         .outerjoin(models.Task, models.Task.id == requested.c.task_id)
+                         .outerjoin(models.TaskAssignment, models.TaskAssignment.task_id == requested.c.task_id))
+        rows = {row.position: row for row in (await self.db.execute(statement)).all()}
+
+        rejected = {}
+        requested_tasks = set()
+        requested_slots = defaultdict(list)
+        slot = timedelta(minutes=get_settings().ASSIGNMENT_SLOT_MINUTES)
+        for index, assignment in batch:
+            row = rows[index]
+            if not row.inspector_found:
+                rejected[index] = "Inspector not found."
+            elif not row.task_found:
+                rejected[index] = "Task not found."
+            elif row.assigned or assignment.task_id in requested_tasks:
+                rejected[index] = "Task already assigned."
+            elif row.after_deadline:
+                rejected[index] = "Scheduled datetime is after deadline."
+            elif row.booked or any(abs(assignment.scheduled_datetime - start) < slot
+                                   for start in requested_slots[assignment.inspector_id]):
+                rejected[index] = "Inspector already booked at that time."
+            else:
+                requested_tasks.add(assignment.task_id)
+                requested_slots[assignment.inspector_id].append(assignment.scheduled_datetime)
+        return rejected
+
+    async def finish_task(self, task_assignment_id: UUID, task_assignment: schemas.TaskAssignmentEvaluation) \
+            -> models.TaskAssignment:
+        try:
+            result = await self.db.execute(select(models.TaskAssignment)
+                                           .where(models.TaskAssignment.id == task_assignment_id).with_for_update())
+            db_task_assignment = result.scalars().first()
+            if not db_task_assignment:
+                raise ValueError("Assignation not found.")
+            if task_assignment.evaluation_datetime > db_task_assignment.scheduled_datetime:
+                raise ValueError("Evaluation date is after schedule datetime.")
+            previous_rating = db_task_assignment.rating \
+                if db_task_assignment.status == schemas.Status.completed else None
+
+            db_task_assignment.evaluation_datetime = task_assignment.evaluation_datetime
+            db_task_assignment.rating = task_assignment.rating
+            db_task_assignment.rating_description = task_assignment.rating_description
+            db_task_assignment.status = schemas.Status.completed
+
+            self.db.add(db_task_assignment)
+            rating_stats = record_rating(db_task_assignment.inspector_id, task_assignment.rating, previous_rating)
+            if rating_stats is not None:
+                await self.db.execute(rating_stats)
+            await publish_assignment_events(self.db, [
+                assignment_event("finished", db_task_assignment.inspector_id, db_task_assignment.id)])
+            await self.db.commit()
+            return db_task_assignment
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_assigned_task(self, task_assignment_id: UUID) -> models.TaskAssignment:
+        try:
+            result = await self.db.execute(select(models.TaskAssignment)
+                                           .where(models.TaskAssignment.id == task_assignment_id))
+            return result.scalars().first()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_assigned_tasks(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[Cursor] = None) -> Dict:
+        try:
+            return await self._get_page(select(models.TaskAssignment), limit, after)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    def stream_assigned_tasks(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Mapping]]:
+        return stream_batches(self.db, select(*EXPORT_COLUMNS), batch_size)
+
+    async def get_from_inspector(self, inspector_id: UUID, limit: int = DEFAULT_PAGE_SIZE,
+                                 after: Optional[Cursor] = None) -> Dict:
+        try:
+            return await self._get_page(self._from_inspector(inspector_id), limit, after)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_unfinished_from_inspector(self, inspector_id: UUID, limit: int = DEFAULT_PAGE_SIZE,
+                                            after: Optional[Cursor] = None) -> Dict:
+        try:
+            return await self._get_page(self._from_inspector(inspector_id, finished=False), limit, after)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_finished_from_inspector(self, inspector_id: UUID, limit: int = DEFAULT_PAGE_SIZE,
+                                          after: Optional[Cursor] = None) -> Dict:
+        try:
+            return await self._get_page(self._from_inspector(inspector_id, finished=True), limit, after)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_version_from_inspector(self, inspector_id: UUID, finished: Optional[bool] = None) \
+            -> Tuple[int, Optional[datetime]]:
+        """Row count and latest last_update of an inspector's assignments, answered from the index alone."""
+        try:
+            statement = self._from_inspector(inspector_id, finished) \
+                .with_only_columns(func.count(), func.max(models.TaskAssignment.last_update))
+            return tuple((await self.db.execute(statement)).one())
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_changes_from_inspector(self, inspector_id: UUID, since: Optional[datetime] = None) -> Dict:
+        """Assignments, their tasks and tombstones changed after ``since``, plus the watermark for the next call.
+
+        A naive ``since`` is taken as UTC.
+        The window starts CHANGE_FEED_OVERLAP_SECONDS before ``since`` so rows whose transaction committed after
+        the previous sync are not skipped; clients apply the feed idempotently.
+        """
+        try:
+            assignments = self._from_inspector(inspector_id)
+            tasks = select(models.Task).join(models.TaskAssignment, models.TaskAssignment.task_id == models.Task.id) \
+                .where(models.TaskAssignment.inspector_id == inspector_id)
+            deleted = select(models.DeletedRecord) \
+                .where(models.DeletedRecord.inspector_id == inspector_id) \
+                .where(models.DeletedRecord.table_name == models.TaskAssignment.__tablename__)
+            if since is not None:
+                since = as_utc(since)
+                lower_bound = since - timedelta(seconds=get_settings().CHANGE_FEED_OVERLAP_SECONDS)
+                assignments = assignments.where(models.TaskAssignment.last_update > lower_bound)
+                # A task newly assigned to the inspector is sent even if the task itself hasn't changed.
+                tasks = tasks.where(or_(models.Task.last_update > lower_bound,
+                                        models.TaskAssignment.last_update > lower_bound))
+                deleted = deleted.where(models.DeletedRecord.deleted_at > lower_bound)
+
+            changed_assignments = (await self.db.execute(assignments)).scalars().all()
+            changed_tasks = (await self.db.execute(tasks)).scalars().all()
+            tombstones = (await self.db.execute(deleted)).scalars().all()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+        versions = [row.last_update for row in changed_assignments + changed_tasks if row.last_update is not None]
+        versions += [tombstone.deleted_at for tombstone in tombstones]
+        if since is not None:
+            versions.append(since)
+        return {
+            "assignments": changed_assignments,
+            "tasks": changed_tasks,
+            "deleted": [{"id": tombstone.record_id, "deleted_at": tombstone.deleted_at} for tombstone in tombstones],
+            "watermark": max(versions, default=None),
+        }
+
+    async def update_assigned_task(self, task_assignment_id: UUID,
+                                   task_assignment: schemas.TaskAssignmentUpdate) -> Row:
+        try:
+            update_data = task_assignment.dict(exclude_unset=True)
+            result = await self.db.execute(update_with_previous_status(task_assignment_id, update_data))
+            db_task_assignment = result.first()
+            if not db_task_assignment:
+                raise ValueError("Assignation not found.")
+            rating_stats = rating_change(db_task_assignment.inspector_id, db_task_assignment.rating,
+                                         db_task_assignment.previous_status == schemas.Status.completed,
+                                         db_task_assignment.status == schemas.Status.completed)
+            if rating_stats is not None:
+                await self.db.execute(rating_stats)
+            await publish_assignment_events(self.db, [
+                assignment_event("updated", db_task_assignment.inspector_id, db_task_assignment.id)])
+            await self.db.commit()
+            return db_task_assignment
+        except Exception as e:
+            await self.db.rollback()
+            if is_booking_conflict(e):
+                raise ValueError("Inspector already booked at that time.") from e
+            raise e
+
+    async def delete_assigned_task(self, task_assignment_id: UUID):
+        try:
+            result = await self.db.execute(delete_with_tombstone(task_assignment_id))
+            tombstone = result.first()
+            if not tombstone:
+                raise ValueError("Assignation not found.")
+            rating_stats = rating_change(tombstone.inspector_id, tombstone.rating,
+                                         tombstone.status == schemas.Status.completed, False)
+            if rating_stats is not None:
+                await self.db.execute(rating_stats)
+            await publish_assignment_events(self.db, [
+                assignment_event("deleted", tombstone.inspector_id, tombstone.record_id)])
+            await self.db.commit()
+            return
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def _get_page(self, statement, limit: int, after: Optional[Cursor]) -> Dict:
+        result = await self.db.execute(keyset(statement, models.TaskAssignment, limit, after))
+        return page(result.scalars().all(), limit)
+
+    @staticmethod
+    def _from_inspector(inspector_id: UUID, finished: Optional[bool] = None):
+        statement = select(models.TaskAssignment).where(models.TaskAssignment.inspector_id == inspector_id)
+        if finished is True:
+            statement = statement.where(models.TaskAssignment.status == schemas.Status.completed)
+        elif finished is False:
+            statement = statement.where(models.TaskAssignment.status < schemas.Status.completed)
+        return statement
@@ -1,12 +1,23 @@
 import uuid
-from typing import List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Union
 from uuid import UUID
 
+from sqlalchemy import and_, delete, exists, func, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.bulk import bulk_result, chunked, validate_rows
+from app.core.cache import LRUCache, publish_invalidation
+from app.core.export import EXPORT_BATCH_SIZE, stream_batches
 from app.core.models import models
+from app.core.pagination import DEFAULT_PAGE_SIZE, Cursor, SearchCursor, keyset, page, search_page
 from app.core.schemas import task_schemas as schemas
 
+UNASSIGNED = ~exists().where(models.TaskAssignment.task_id == models.Task.id)
+EXPORT_COLUMNS = [column for column in models.Task.__table__.c if column.key != "search_vector"]
+
 
 class TaskService:
     def __init__(self, db: Session):
@@ -18,13 +29,10 @@ class TaskService:
             db_task.id = uuid.uuid4()
             self.db.add(db_task)
             self.db.commit()
-            self.db.refresh(db_task)
             return db_task
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_task(self, task_id: UUID) -> models.Task:
         try:
@@ -33,8 +41,6 @@ class TaskService:
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_tasks(self) -> List[models.Task]:
         try:
@@ -42,45 +48,161 @@ class TaskService:
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def get_available_tasks(self) -> List[models.Task]:
         try:
-            return self.db.query(models.Task).join(models.TaskAssignment)\
-                .filter(models.Task.id != models.TaskAssignment.task_id).all()
+            return self.db.query(models.Task).filter(UNASSIGNED).all()
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
-    def update_task(self, task_id: UUID, task: schemas.TaskUpdate) -> models.Task:
+    def update_task(self, task_id: UUID, task: schemas.TaskUpdate) -> Row:
         try:
-            db_task = self.get_task(task_id)
+            table = models.Task.__table__
             update_data = task.dict(exclude_unset=True)
-            for key, value in update_data.items():
-                setattr(db_task, key, value)
+            result = self.db.execute(update(table).where(table.c.id == task_id).values(**update_data)
+                                     .returning(*EXPORT_COLUMNS))
+            db_task = result.first()
+            if not db_task:
+                raise ValueError("Task not found.")
             self.db.commit()
-            self.db.refresh(db_task)
             return db_task
         except Exception as e:
             self.db.rollback()
             raise e
-        finally:
-            self.db.close()
 
     def delete_task(self, task_id: UUID):
         try:
-            db_task = self.get_task(task_id)
-            self.db.delete(db_task)
+            table = models.Task.__table__
+            result = self.db.execute(delete(table).where(table.c.id == task_id).returning(table.c.id))
+            if not result.first():
+                raise ValueError("Task not found.")
             self.db.commit()
             return
         except Exception as e:
             self.db.rollback()
             raise e
+
+
+class AsyncTaskService:
+    def __init__(self, db: AsyncSession, cache: Optional[LRUCache] = None):
+        self.db = db
+        self.cache = cache
+
+    async def create_task(self, task: schemas.TaskCreate) -> models.Task:
+        try:
+            db_task = models.Task(**task.dict())
+            db_task.id = uuid.uuid4()
+            self.db.add(db_task)
+            await self.db.commit()
+            return db_task
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
+            raise e
+
+    async def create_tasks(self, tasks: List[Dict[str, Any]]) -> Dict:
+        valid, results = validate_rows(tasks, schemas.TaskCreate)
+        try:
+            for batch in chunked(valid):
+                values = [dict(task.dict(), id=uuid.uuid4()) for _, task in batch]
+                await self.db.execute(insert(models.Task).values(values))
+                results.extend({"index": index, "id": value["id"]} for (index, _), value in zip(batch, values))
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+        return bulk_result(results)
+
+    async def get_task(self, task_id: UUID) -> Union[models.Task, schemas.Task]:
+        if self.cache is not None:
+            task = self.cache.get(task_id)
+            if task is not None:
+                return task
+        try:
+            result = await self.db.execute(select(models.Task).where(models.Task.id == task_id))
+            task = result.scalars().first()
+            if task is not None and self.cache is not None:
+                task = schemas.Task.from_orm(task)
+                self.cache.set(task_id, task)
+            return task
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def get_tasks(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[Cursor] = None) -> Dict:
+        try:
+            result = await self.db.execute(keyset(select(models.Task), models.Task, limit, after))
+            return page(result.scalars().all(), limit)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    def stream_tasks(self, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[Mapping]]:
+        return stream_batches(self.db, select(*EXPORT_COLUMNS), batch_size)
+
+    async def get_available_tasks(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[Cursor] = None,
+                                  deadline_after: Optional[datetime] = None, deadline_before: Optional[datetime] = None,
+                                  location: Optional[str] = None) -> Dict:
+        try:
+            statement = select(models.Task).where(UNASSIGNED)
+            if deadline_after is not None:
+                statement = statement.where(models.Task.deadline >= deadline_after)
+            if deadline_before is not None:
+                statement = statement.where(models.Task.deadline <= deadline_before)
+            if location is not None:
+                statement = statement.where(models.Task.location == location)
+            result = await self.db.execute(keyset(statement, models.Task, limit, after))
+            return page(result.scalars().all(), limit)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def search_tasks(self, query: str, limit: int = DEFAULT_PAGE_SIZE, after: Optional[SearchCursor] = None) \
+            -> Dict:
+        """Tasks matching ``query`` (web search syntax) by title, location and description, best match first."""
+        try:
+            ts_query = func.websearch_to_tsquery(models.SEARCH_CONFIG, query)
+            rank = func.ts_rank(models.Task.search_vector, ts_query)
+            statement = select(models.Task, rank.label("rank")).where(models.Task.search_vector.op("@@")(ts_query))
+            if after is not None:
+                statement = statement.where(or_(rank < after[0], and_(rank == after[0], models.Task.id > after[1])))
+            result = await self.db.execute(statement.order_by(rank.desc(), models.Task.id).limit(limit + 1))
+            return search_page(result.all(), limit)
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def update_task(self, task_id: UUID, task: schemas.TaskUpdate) -> Row:
+        try:
+            table = models.Task.__table__
+            update_data = task.dict(exclude_unset=True)
+            result = await self.db.execute(update(table).where(table.c.id == task_id).values(**update_data)
+                                           .returning(*EXPORT_COLUMNS))
+            db_task = result.first()
+            if not db_task:
+                raise ValueError("Task not found.")
+            if self.cache is not None:
+                await publish_invalidation(self.db, self.cache, task_id)
+            await self.db.commit()
+            if self.cache is not None:
+                self.cache.invalidate(task_id)
+            return db_task
+        except Exception as e:
+            await self.db.rollback()
+            raise e
+
+    async def delete_task(self, task_id: UUID):
+        try:
+            table = models.Task.__table__
+            result = await self.db.execute(delete(table).where(table.c.id == task_id).returning(table.c.id))
+            if not result.first():
+                raise ValueError("Task not found.")
+            if self.cache is not None:
+                await publish_invalidation(self.db, self.cache, task_id)
+            await self.db.commit()
+            if self.cache is not None:
+                self.cache.invalidate(task_id)
+            return
+        except Exception as e:
+            await self.db.rollback()
             raise e
-        finally:
-            self.db.close()
@@ -0,0 +1,28 @@
+"""Times a cold ``import main`` and the first engine creation in fresh interpreters.
+
+Usage: python benchmarks/startup_benchmark.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+
+IMPORT_APP = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+FIRST_ENGINE = "import main, time; from app.core.db.session import get_engine, get_async_engine; " \
+               "start = time.perf_counter(); get_engine(); get_async_engine(); print(time.perf_counter() - start)"
+
+
+def measure(code: str, runs: int):
+    return [float(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+                  .stdout.split()[-1]) * 1000 for _ in range(runs)]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, code in (("import main", IMPORT_APP), ("first engine", FIRST_ENGINE)):
+        timings = measure(code, runs)
+        print(f"{name:<14} median {statistics.median(timings):7.1f} ms  min {min(timings):7.1f} ms  "
+              f"max {max(timings):7.1f} ms  ({runs} runs)")
+
+
+if __name__ == '__main__':
+    main()
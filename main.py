@@ -1,17 +1,70 @@
+import asyncio
 import sys
+from datetime import date, timedelta
 
 import uvicorn
 from fastapi import FastAPI
 
-from app.api.endpoints import inspector_endpoints, task_endpoints, task_assignment_endpoints
-from app.core.db.session import get_db_session
+from app.api.endpoints import inspector_endpoints, internal_endpoints, metrics_endpoints, report_endpoints, \
+    task_endpoints, task_assignment_endpoints
+from app.core.cache import clear_caches, handle_invalidation
+from app.core.db.listener import listener
+from app.core.config.settings import get_settings
+from app.core.db.session import dispose_engines, get_async_sessionmaker, get_db_session, warm_up_async_pool
+from app.core.events import broker
+from app.core.middleware import MetricsMiddleware, ProfilingMiddleware
 from app.core.models.models import Base
+from app.services.inspector_service import InspectorService
+from app.services.task_assignment_service import AsyncTaskAssignmentService
 
 app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(inspector_endpoints.router, prefix="/inspector", tags=["inspector"])
 app.include_router(task_endpoints.router, prefix="/task", tags=["task"])
 app.include_router(task_assignment_endpoints.router, prefix="/task_assignment", tags=["task_assignment"])
+app.include_router(report_endpoints.router, prefix="/reports", tags=["reports"])
+app.include_router(internal_endpoints.router, prefix="/internal", tags=["internal"])
+app.include_router(metrics_endpoints.router, tags=["metrics"])
+
+
+@app.on_event("startup")
+async def warm_up_pool():
+    settings = get_settings()
+    if settings.DB_POOL_WARMUP:
+        try:
+            await warm_up_async_pool(settings.DB_POOL_SIZE)
+        except Exception as e:
+            print(f"Unable to warm up the connection pool. Exception: {e}")
+
+
+@app.on_event("startup")
+async def start_listener():
+    settings = get_settings()
+    if settings.CACHE_INVALIDATION_CHANNEL:
+        listener.subscribe(settings.CACHE_INVALIDATION_CHANNEL, handle_invalidation)
+        listener.on_reconnect(clear_caches)
+    if settings.ASSIGNMENT_EVENTS_CHANNEL:
+        listener.subscribe(settings.ASSIGNMENT_EVENTS_CHANNEL, broker.dispatch)
+        listener.on_reconnect(broker.resync)
+    if settings.CACHE_INVALIDATION_CHANNEL or settings.ASSIGNMENT_EVENTS_CHANNEL:
+        await listener.start(settings.DATABASE_URL)
+
+
+@app.on_event("shutdown")
+async def stop_listener():
+    await listener.stop()
+
+
+@app.on_event("shutdown")
+async def close_engines():
+    await dispose_engines()
+
+
+async def schedule(day: date, dry_run: bool):
+    async with get_async_sessionmaker()() as session:
+        return await AsyncTaskAssignmentService(session).schedule(day, dry_run)
 
 
 def main():
@@ -34,9 +87,29 @@ def main():
         session.close()
         exit()
 
+    if sys.argv[1] == "rebuild_stats":
+        session = next(get_db_session())
+        try:
+            print(f"Rebuilt rating stats for {InspectorService(session).rebuild_rating_stats()} inspectors.")
+        finally:
+            session.close()
+        exit()
+
+    if sys.argv[1] == "schedule":
+        day = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != "--dry-run" \
+            else date.today() + timedelta(days=1)
+        result = asyncio.run(schedule(day, "--dry-run" in sys.argv))
+        print(f"{'Planned' if result['dry_run'] else 'Assigned'} {result['assigned']} tasks for {day}, "
+              f"{result['unassigned']} left unassigned.")
+        exit()
+
     if sys.argv[1] == "run":
         uvicorn.run("main:app", host="0.0.0.0", port=5050, log_level="info")
 
+    if sys.argv[1] == "serve":
+        from app.core.server import ProductionServer
+        ProductionServer("main:app", get_settings()).run()
+
 
 if __name__ == '__main__':
     main()
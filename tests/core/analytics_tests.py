@@ -0,0 +1,149 @@
+import asyncio
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import analytics
+from app.core.analytics import AssignmentSnapshot
+from app.core.schemas.task_assignment_schemas import Status
+
+DAY = datetime(2023, 4, 27, tzinfo=timezone.utc)
+
+
+def assignment(hours_late=None, rating=None, tz="Madrid", status=Status.completed, **values):
+    deadline = DAY + timedelta(hours=12)
+    row = {"id": uuid.uuid4(), "scheduled_datetime": DAY + timedelta(hours=9), "rating": rating,
+           "evaluation_datetime": deadline + timedelta(hours=hours_late) if hours_late is not None else None,
+           "status": status, "last_update": DAY, "deadline": deadline, "timezone": tz, "task_last_update": DAY,
+           "inspector_last_update": DAY}
+    row.update(values)
+    return row
+
+
+class TestAssignmentSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = AssignmentSnapshot()
+
+    def test_changed_rows_are_overwritten_in_place(self):
+        row = assignment(rating=4.0)
+        self.snapshot.apply([row, assignment()])
+        self.snapshot.apply([dict(row, rating=9.0)])
+
+        columns = self.snapshot.select()
+
+        self.assertEqual(self.snapshot.size, 2)
+        self.assertEqual(columns["rating"][0], 9.0)
+
+    def test_removed_rows_and_date_range_are_filtered(self):
+        deleted = assignment()
+        self.snapshot.apply([deleted, assignment(), assignment(scheduled_datetime=DAY + timedelta(days=2))])
+        self.snapshot.remove([deleted["id"], uuid.uuid4()])
+
+        self.assertEqual(self.snapshot.select()["scheduled"].size, 2)
+        self.assertEqual(self.snapshot.select(DAY, DAY + timedelta(days=1))["scheduled"].size, 1)
+
+    def test_columns_grow_past_their_capacity(self):
+        self.snapshot.apply([assignment() for _ in range(1500)])
+
+        self.assertEqual(self.snapshot.select()["alive"].size, 1500)
+
+
+class TestAssignmentSnapshotRefresh(unittest.IsolatedAsyncioTestCase):
+    async def test_refresh_only_reads_changes_after_the_watermark(self):
+        snapshot = AssignmentSnapshot()
+        db_mock = Mock(spec=AsyncSession)
+        db_mock.execute.return_value = Mock()
+        db_mock.execute.return_value.all.return_value = []
+        statements = []
+
+        async def stream_batches(db, statement, batch_size):
+            statements.append(statement)
+            yield [assignment(last_update=DAY + timedelta(hours=len(statements)))]
+
+        with patch.object(analytics, "stream_batches", stream_batches):
+            await snapshot.refresh(db_mock)
+            await snapshot.refresh(db_mock, max_age=60)
+            await snapshot.refresh(db_mock)
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(snapshot.watermark, DAY + timedelta(hours=2))
+        self.assertNotIn("WHERE", str(statements[0].compile(dialect=postgresql.dialect())))
+        sql = str(statements[1].compile(dialect=postgresql.dialect()))
+        self.assertEqual(sql.count(" UNION "), 2)
+        self.assertIn("WHERE task_assignments.last_update > ", sql)
+        self.assertIn("WHERE jobs.last_update > ", sql)
+        self.assertIn("WHERE inspectors.last_update > ", sql)
+
+    async def test_task_and_inspector_changes_move_the_watermark(self):
+        snapshot = AssignmentSnapshot()
+        db_mock = Mock(spec=AsyncSession)
+        db_mock.execute.return_value = Mock()
+        db_mock.execute.return_value.all.return_value = []
+
+        async def stream_batches(db, statement, batch_size):
+            yield [assignment(inspector_last_update=DAY + timedelta(hours=3)),
+                   assignment(task_last_update=DAY + timedelta(hours=5), inspector_last_update=None)]
+
+        with patch.object(analytics, "stream_batches", stream_batches):
+            await snapshot.refresh(db_mock)
+
+        self.assertEqual(snapshot.watermark, DAY + timedelta(hours=5))
+
+
+class TestAssignmentSnapshotLock(unittest.TestCase):
+    def test_contended_refreshes_work_from_several_event_loops(self):
+        snapshot = AssignmentSnapshot()
+        db_mock = Mock(spec=AsyncSession)
+        db_mock.execute.return_value = Mock()
+        db_mock.execute.return_value.all.return_value = []
+
+        async def stream_batches(db, statement, batch_size):
+            await asyncio.sleep(0)
+            yield [assignment()]
+
+        async def contended_refreshes():
+            await asyncio.gather(snapshot.refresh(db_mock), snapshot.refresh(db_mock))
+
+        with patch.object(analytics, "stream_batches", stream_batches):
+            asyncio.run(contended_refreshes())
+            asyncio.run(contended_refreshes())
+
+        self.assertIsNotNone(snapshot.refreshed_at)
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        snapshot = AssignmentSnapshot()
+        snapshot.apply([assignment(hours_late=-1, rating=8.0), assignment(hours_late=2, rating=3.0, tz="UK"),
+                        assignment(hours_late=4, rating=5.5, tz=None), assignment(status=Status.pending)])
+        self.columns = snapshot.select()
+
+    def test_on_time_and_lateness(self):
+        on_time = analytics.on_time_report(self.columns)
+        lateness = analytics.lateness_report(self.columns)
+
+        self.assertEqual(on_time, {"completed": 3, "with_deadline": 3, "on_time": 1, "on_time_rate": 1 / 3})
+        self.assertEqual(lateness["late"], 2)
+        self.assertEqual(lateness["average_lateness_seconds"], 7200.0)
+        self.assertEqual(lateness["average_lateness_of_late_seconds"], 10800.0)
+
+    def test_throughput_per_timezone(self):
+        throughput = {row["timezone"]: row["completed"] for row in analytics.throughput_report(self.columns, 1)}
+
+        self.assertEqual(throughput, {"Madrid": 1, "Mexico city": 0, "UK": 1, None: 1})
+
+    def test_rating_distribution(self):
+        ratings = analytics.rating_report(self.columns)
+
+        self.assertEqual(ratings["count"], 3)
+        self.assertEqual(ratings["p50"], 5.5)
+        self.assertEqual(sum(bucket["count"] for bucket in ratings["histogram"]), 3)
+        self.assertEqual(ratings["histogram"][8], {"lower": 8.0, "upper": 9.0, "count": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import uuid
+from unittest.mock import patch
+
+from app.core import cache as cache_module
+from app.core.cache import LRUCache, handle_invalidation
+
+
+class TestLRUCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = LRUCache("test", max_size=2, ttl=60)
+
+    def test_hit_and_miss_are_counted(self):
+        self.cache.set("a", 1)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_entries_expire_after_ttl(self):
+        with patch.object(cache_module.time, "monotonic", return_value=100.0):
+            self.cache.set("a", 1)
+        with patch.object(cache_module.time, "monotonic", return_value=161.0):
+            self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_invalidation_payload_drops_entry(self):
+        key = uuid.uuid4()
+        cache_module.inspector_cache.set(key, "inspector")
+
+        handle_invalidation(f"inspector:{key}")
+
+        self.assertIsNone(cache_module.inspector_cache.get(key))
+
+    def test_malformed_invalidation_payload_is_ignored(self):
+        handle_invalidation("unknown:not-a-uuid")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from datetime import datetime, timezone
+
+from app.core.etag import compute_etag, etag_matches, not_modified
+
+
+class TestETag(unittest.TestCase):
+    def setUp(self):
+        self.etag = compute_etag(3, datetime(2023, 4, 27, tzinfo=timezone.utc), 50, None)
+
+    def test_etag_changes_with_version(self):
+        self.assertNotEqual(self.etag, compute_etag(4, datetime(2023, 4, 27, tzinfo=timezone.utc), 50, None))
+        self.assertTrue(self.etag.startswith('"') and self.etag.endswith('"'))
+
+    def test_matches_listed_and_weak_tags(self):
+        self.assertTrue(etag_matches(self.etag, self.etag))
+        self.assertTrue(etag_matches(f'"other", W/{self.etag}', self.etag))
+        self.assertTrue(etag_matches("*", self.etag))
+        self.assertFalse(etag_matches('"other"', self.etag))
+        self.assertFalse(etag_matches(None, self.etag))
+
+    def test_not_modified_response(self):
+        response = not_modified(self.etag, self.etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], self.etag)
+        self.assertIsNone(not_modified(None, self.etag))
+
+
+if __name__ == '__main__':
+    unittest.main()
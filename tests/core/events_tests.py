@@ -0,0 +1,70 @@
+import asyncio
+import json
+import unittest
+import uuid
+
+from app.core import events as events_module
+from app.core.events import AssignmentBroker, assignment_event, sse_stream
+
+
+class TestAssignmentBroker(unittest.TestCase):
+    def setUp(self):
+        self.broker = AssignmentBroker()
+
+    def test_dispatch_reaches_only_the_inspector_subscribers(self):
+        inspector_id = uuid.uuid4()
+        queue = self.broker.subscribe(inspector_id)
+        other = self.broker.subscribe(uuid.uuid4())
+        event = assignment_event("created", inspector_id, uuid.uuid4())
+
+        self.broker.dispatch(json.dumps(event))
+
+        self.assertEqual(queue.get_nowait(), event)
+        self.assertTrue(other.empty())
+
+    def test_full_queue_drops_the_oldest_event(self):
+        inspector_id = uuid.uuid4()
+        queue = self.broker.subscribe(inspector_id)
+        for _ in range(events_module.SUBSCRIBER_QUEUE_SIZE + 1):
+            self.broker.dispatch(json.dumps(assignment_event("updated", inspector_id, uuid.uuid4())))
+
+        self.assertEqual(queue.qsize(), events_module.SUBSCRIBER_QUEUE_SIZE)
+
+    def test_malformed_payload_is_ignored(self):
+        queue = self.broker.subscribe(uuid.uuid4())
+
+        self.broker.dispatch("not json")
+
+        self.assertTrue(queue.empty())
+
+    def test_resync_notifies_every_subscriber(self):
+        queues = [self.broker.subscribe(uuid.uuid4()) for _ in range(2)]
+
+        self.broker.resync()
+
+        self.assertTrue(all(queue.get_nowait() == {"event": "resync"} for queue in queues))
+
+
+class TestSseStream(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_formats_events_and_unsubscribes_when_cancelled(self):
+        inspector_id = uuid.uuid4()
+        event = assignment_event("finished", inspector_id, uuid.uuid4())
+
+        stream = sse_stream(inspector_id)
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        events_module.broker.dispatch(json.dumps(event))
+        chunk = await pending
+        # StreamingResponse cancels the response task when the client disconnects.
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+        self.assertEqual(chunk, f"event: finished\ndata: {json.dumps(event)}\n\n")
+        self.assertNotIn(str(inspector_id), events_module.broker._subscribers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import unittest
+import uuid
+from datetime import datetime, timezone
+
+from app.core.export import ExportFormat, csv_chunks, export_response, ndjson_chunks
+
+
+async def _batches(*batches):
+    for batch in batches:
+        yield batch
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+class TestExport(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.row = {"id": uuid.uuid4(), "title": "Test task",
+                    "deadline": datetime(2023, 4, 27, 16, 21, tzinfo=timezone.utc)}
+
+    async def test_ndjson_writes_one_chunk_per_batch(self):
+        chunks = await _collect(ndjson_chunks(_batches([self.row, self.row], [self.row])))
+
+        self.assertEqual(len(chunks), 2)
+        lines = "".join(chunks).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0]), {"id": str(self.row["id"]), "title": "Test task",
+                                                "deadline": "2023-04-27T16:21:00+00:00"})
+
+    async def test_csv_writes_header_before_rows(self):
+        chunks = await _collect(csv_chunks(["id", "title"], _batches([self.row])))
+
+        self.assertEqual(chunks[0], "id,title\r\n")
+        self.assertEqual(chunks[1], f"{self.row['id']},Test task\r\n")
+
+    def test_export_response_media_type(self):
+        response = export_response(_batches(), ["id"], ExportFormat.csv, "tasks")
+
+        self.assertEqual(response.media_type, "text/csv")
+        self.assertIn('filename="tasks.csv"', response.headers["content-disposition"])
+
+
+if __name__ == '__main__':
+    unittest.main()
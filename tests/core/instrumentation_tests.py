@@ -0,0 +1,88 @@
+import json
+import threading
+import unittest
+import uuid
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.util._concurrency_py3k import greenlet_spawn
+
+from app.core.db.instrumentation import SlowQueryLog, instrument, redact, service_method
+from app.core.metrics import RequestStats, current_request
+
+SERVICE_SOURCE = '''
+class FakeService:
+    def run(self, callback):
+        return callback()
+
+    async def run_async(self, callback):
+        return await greenlet_spawn(callback)
+'''
+
+
+def fake_service():
+    namespace = {"__name__": "app.services.fake_service", "greenlet_spawn": greenlet_spawn}
+    exec(SERVICE_SOURCE, namespace)
+    return namespace["FakeService"]()
+
+
+class TestServiceMethod(unittest.IsolatedAsyncioTestCase):
+    def test_sync_caller_is_found_on_the_stack(self):
+        self.assertEqual(fake_service().run(service_method), "FakeService.run")
+
+    async def test_async_caller_is_found_through_the_greenlet_parents(self):
+        self.assertEqual(await fake_service().run_async(service_method), "FakeService.run_async")
+
+    def test_no_service_on_the_stack(self):
+        self.assertIsNone(service_method())
+
+
+class TestSlowQueryLog(unittest.TestCase):
+    def setUp(self):
+        self.slow_query_log = SlowQueryLog(threshold_ms=0)
+        self.engine = instrument(create_engine("sqlite://"), self.slow_query_log)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_parameters_are_redacted_to_their_types(self):
+        self.assertEqual(redact({"email": "john@example.com", "id": uuid.uuid4()}), {"email": "str", "id": "UUID"})
+        self.assertEqual(redact(("john@example.com", 3)), ["str", "int"])
+
+    def test_slow_statement_is_logged_with_its_route(self):
+        token = current_request.set(RequestStats("/task/task_id={task_id}"))
+        try:
+            with self.assertLogs("app.slow_query") as logs, self.engine.connect() as connection:
+                connection.execute(text("SELECT :email"), {"email": "john@example.com"}).all()
+        finally:
+            current_request.reset(token)
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry["statement"], "SELECT ?")
+        self.assertEqual(entry["parameters"], ["str"])
+        self.assertEqual(entry["route"], "/task/task_id={task_id}")
+        self.assertNotIn("john@example.com", logs.output[0])
+
+    def test_fast_statements_and_unsampled_statements_are_not_logged(self):
+        for slow_query_log in (SlowQueryLog(threshold_ms=60000), SlowQueryLog(threshold_ms=0, sample_rate=0)):
+            self.slow_query_log.threshold, self.slow_query_log.sample_rate = \
+                slow_query_log.threshold, slow_query_log.sample_rate
+            with patch("app.core.db.instrumentation.logger") as logger, self.engine.connect() as connection:
+                connection.execute(text("SELECT 1")).all()
+            logger.warning.assert_not_called()
+
+    def test_plan_of_slow_select_is_captured_in_the_background(self):
+        captured = threading.Event()
+        slow_query_log = SlowQueryLog(threshold_ms=0, explain=True, explain_engine=lambda: self.engine)
+        engine = instrument(create_engine("sqlite://"), slow_query_log)
+        with patch.object(slow_query_log, "explain_plan", side_effect=lambda *args: captured.set()) as explain_plan:
+            with self.assertLogs("app.slow_query"), engine.connect() as connection:
+                connection.execute(text("SELECT :id"), {"id": 1}).all()
+            self.assertTrue(captured.wait(1))
+
+        explain_plan.assert_called_once_with("SELECT ?", (1,))
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.db.instrumentation import instrument
+from app.core.metrics import RequestStats, RouteRegistry, current_request
+from app.core.middleware import MetricsMiddleware, UNMATCHED_ROUTE
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.engine = instrument(create_engine("sqlite://"))
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_statements_and_rows_are_added_to_the_current_request(self):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1 UNION ALL SELECT 2")).all()
+                connection.execute(text("SELECT 3")).all()
+        finally:
+            current_request.reset(token)
+
+        self.assertEqual(stats.statements, 2)
+        self.assertEqual(stats.rows, 3)
+        self.assertGreater(stats.db_seconds, 0)
+
+    def test_streamed_rows_are_counted_as_they_are_fetched(self):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execution_options(stream_results=True, yield_per=2) \
+                    .execute(text("SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3"))
+                partitions = [len(partition) for partition in result.partitions(2)]
+        finally:
+            current_request.reset(token)
+
+        self.assertEqual(partitions, [2, 1])
+        self.assertEqual(stats.rows, 3)
+
+    def test_statements_outside_a_request_are_ignored(self):
+        with self.engine.connect() as connection:
+            connection.execute(text("SELECT 1")).all()
+
+        self.assertIsNone(current_request.get())
+
+
+class TestMetricsMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.registry = RouteRegistry()
+        self.engine = instrument(create_engine("sqlite://"))
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware, registry=self.registry)
+
+        @app.get("/task/task_id={task_id}")
+        def get_task(task_id: int):
+            with self.engine.connect() as connection:
+                for _ in range(3):
+                    connection.execute(text("SELECT 1")).all()
+            return {"id": task_id}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_requests_are_recorded_by_route_template(self):
+        self.client.get("/task/task_id=1")
+        self.client.get("/task/task_id=2")
+
+        metrics = self.registry.get("GET", "/task/task_id={task_id}")
+        self.assertEqual(metrics.responses, {200: 2})
+        self.assertEqual(metrics.latency.snapshot()["count"], 2)
+        self.assertEqual(metrics.statements.snapshot()["sum"], 6)
+
+    def test_unknown_paths_share_one_label(self):
+        self.client.get("/nothing/here")
+        self.client.get("/nothing/there")
+
+        self.assertEqual(self.registry.get("GET", UNMATCHED_ROUTE).responses, {404: 2})
+
+    def test_render_uses_the_prometheus_text_format(self):
+        self.client.get("/task/task_id=1")
+
+        output = self.registry.render()
+        labels = 'method="GET",route="/task/task_id={task_id}"'
+        self.assertIn("# TYPE http_request_duration_seconds histogram", output)
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1', output)
+        self.assertIn(f'db_statements_per_request_bucket{{{labels},le="3"}} 1', output)
+        self.assertIn(f'db_statements_per_request_bucket{{{labels},le="2"}} 0', output)
+        self.assertIn(f"db_seconds_per_request_count{{{labels}}} 1", output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.models import models
+from app.core.pagination import decode_cursor, decode_search_cursor, encode_cursor, keyset, page, search_page
+
+SearchRow = namedtuple("SearchRow", ["Task", "rank"])
+
+
+class TestPagination(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        created_at = datetime(2023, 4, 27, 16, 21, 24, 645804, tzinfo=timezone.utc)
+        id = uuid.uuid4()
+
+        self.assertEqual(decode_cursor(encode_cursor(created_at, id)), (created_at, id))
+
+    def test_decode_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_keyset_filters_after_cursor(self):
+        after = (datetime.now(timezone.utc), uuid.uuid4())
+
+        statement = keyset(select(models.Task), models.Task, 10, after)
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        self.assertIn("(jobs.created_at, jobs.id) >", sql)
+        self.assertIn("ORDER BY jobs.created_at, jobs.id", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_page_returns_cursor_of_last_item(self):
+        rows = [models.Task(id=uuid.uuid4(), created_at=datetime.now(timezone.utc)) for _ in range(3)]
+
+        result = page(rows, 2)
+
+        self.assertEqual(result["items"], rows[:2])
+        self.assertEqual(decode_cursor(result["next_cursor"]), (rows[1].created_at, rows[1].id))
+
+    def test_last_page_has_no_cursor(self):
+        rows = [models.Task(id=uuid.uuid4(), created_at=datetime.now(timezone.utc)) for _ in range(2)]
+
+        self.assertIsNone(page(rows, 2)["next_cursor"])
+
+    def test_search_page_returns_rank_cursor(self):
+        tasks = [models.Task(id=uuid.uuid4()) for _ in range(3)]
+        rows = [SearchRow(task, rank) for task, rank in zip(tasks, (0.9, 0.5, 0.1))]
+
+        result = search_page(rows, 2)
+
+        self.assertEqual(result["items"], tasks[:2])
+        self.assertEqual(decode_search_cursor(result["next_cursor"]), (0.5, tasks[1].id))
+
+
+if __name__ == '__main__':
+    unittest.main()
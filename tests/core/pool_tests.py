@@ -0,0 +1,43 @@
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.db.pool import InstrumentedQueuePool, PoolMetrics
+
+
+class TestInstrumentedQueuePool(unittest.TestCase):
+    def setUp(self):
+        class Pool(InstrumentedQueuePool):
+            metrics = PoolMetrics()
+
+        self.engine = create_engine("sqlite://", poolclass=Pool, pool_size=1, max_overflow=0, pool_timeout=0.01)
+        self.pool = self.engine.pool
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_checkout_and_checkin_are_counted(self):
+        connection = self.engine.connect()
+        connection.close()
+
+        stats = self.pool.metrics.snapshot(self.pool)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["checkins"], 1)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["wait_seconds"]["count"], 1)
+
+    def test_exhausted_pool_counts_wait_and_timeout(self):
+        connection = self.engine.connect()
+        with self.assertRaises(PoolTimeoutError):
+            self.engine.connect()
+        connection.close()
+
+        stats = self.pool.metrics.snapshot(self.pool)
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
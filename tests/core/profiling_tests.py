@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.db.instrumentation import instrument
+from app.core.middleware import ProfilingMiddleware
+from app.core.profiling import Profile, parse_sample_rates
+
+
+class TestProfile(unittest.TestCase):
+    def test_sample_rates_by_route_or_endpoint_name(self):
+        self.assertEqual(parse_sample_rates("/task/available/all=0.01, create_assigned_task=1,"),
+                         {"/task/available/all": 0.01, "create_assigned_task": 1.0})
+
+    def test_folded_stacks_are_rooted_at_the_profile_name(self):
+        profile = Profile("GET /task/all", 0.005)
+        profile.add(("main:run", "app.services.task_service:get_tasks"), 3)
+        profile.add_statement(None, "SELECT *\n  FROM jobs;", 0.02)
+
+        self.assertEqual(profile.folded(), "GET /task/all;SQL SELECT * FROM jobs, 4\n"
+                                           "GET /task/all;main:run;app.services.task_service:get_tasks 3\n")
+
+
+class TestProfilingMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = instrument(create_engine("sqlite://"))
+        self.client = self.create_client({})
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def create_client(self, sample_rates):
+        app = FastAPI()
+        app.add_middleware(ProfilingMiddleware, token="secret", sample_rates=sample_rates,
+                           directory=self.directory.name, interval=0.001)
+
+        @app.get("/task/task_id={task_id}")
+        async def get_busy_task(task_id: int):
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1")).all()
+            total = sum(i * i for i in range(300000))
+            return {"id": task_id, "total": total}
+
+        return TestClient(app)
+
+    def test_request_with_the_token_is_profiled(self):
+        response = self.client.get("/task/task_id=1", headers={"X-Profile-Token": "secret"})
+
+        with open(os.path.join(self.directory.name, response.headers["X-Profile"])) as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith("GET /task/task_id={task_id}") for line in lines))
+        self.assertTrue(any("SQL SELECT 1 " in line for line in lines))
+
+    def test_requests_are_not_profiled_by_default(self):
+        for headers in ({}, {"X-Profile-Token": "wrong"}):
+            response = self.client.get("/task/task_id=1", headers=headers)
+            self.assertNotIn("X-Profile", response.headers)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_sampled_route_is_profiled(self):
+        response = self.create_client({"get_busy_task": 1}).get("/task/task_id=1")
+
+        self.assertIn(response.headers["X-Profile"], os.listdir(self.directory.name))
+
+
+if __name__ == '__main__':
+    unittest.main()
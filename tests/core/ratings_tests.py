@@ -0,0 +1,66 @@
+import unittest
+import uuid
+from unittest.mock import Mock
+
+from sqlalchemy.dialects import postgresql
+
+from app.core import ratings
+
+
+class TestRecordRating(unittest.TestCase):
+    def test_first_rating_adds_to_its_bucket(self):
+        statement = ratings.record_rating(uuid.uuid4(), 7.5)
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        params = statement.compile().params
+        self.assertIn("ON CONFLICT (inspector_id) DO UPDATE", sql)
+        self.assertIn("histogram[8] = inspector_rating_stats.histogram[8] + 1", sql)
+        self.assertEqual(params["count_delta"], 1)
+        self.assertEqual(params["histogram"][7], 1)
+        self.assertEqual(sum(params["histogram"]), 1)
+
+    def test_re_rating_retracts_the_previous_rating(self):
+        statement = ratings.record_rating(uuid.uuid4(), 9.0, previous_rating=3.0)
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        params = statement.compile().params
+        self.assertIn("histogram[10] = inspector_rating_stats.histogram[10] + 1", sql)
+        self.assertIn("histogram[4] = inspector_rating_stats.histogram[4] + -1", sql)
+        self.assertEqual(params["count_delta"], 0)
+        self.assertEqual(params["sum_delta"], 6.0)
+        self.assertEqual(params["sum_squares_delta"], 72.0)
+
+    def test_no_rating_needs_no_update(self):
+        self.assertIsNone(ratings.record_rating(uuid.uuid4(), None))
+
+    def test_bucket_of_matches_width_bucket(self):
+        self.assertEqual(ratings.bucket_of(0.5), 0)
+        self.assertEqual(ratings.bucket_of(1.0), 1)
+        self.assertEqual(ratings.bucket_of(10.0), len(ratings.RATING_BUCKET_BOUNDS))
+
+
+class TestSummarize(unittest.TestCase):
+    def test_mean_and_variance_come_from_the_running_sums(self):
+        histogram = [0] * (len(ratings.RATING_BUCKET_BOUNDS) + 1)
+        histogram[2], histogram[4] = 1, 1
+        stats = Mock(rating_count=2, rating_sum=6.0, rating_sum_squares=20.0, recent_ratings=[4.0, 2.0],
+                     histogram=histogram)
+
+        summary = ratings.summarize(uuid.uuid4(), stats)
+
+        self.assertEqual(summary["mean"], 3.0)
+        self.assertEqual(summary["variance"], 1.0)
+        self.assertEqual(summary["histogram"][0], {"lower": None, "upper": 1.0, "count": 0})
+        self.assertEqual(summary["histogram"][2], {"lower": 2.0, "upper": 3.0, "count": 1})
+        self.assertEqual(summary["histogram"][-1]["upper"], None)
+
+    def test_inspector_without_ratings(self):
+        summary = ratings.summarize(uuid.uuid4(), None)
+
+        self.assertEqual(summary["count"], 0)
+        self.assertIsNone(summary["mean"])
+        self.assertEqual(summary["recent_ratings"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from app.core import scheduler
+
+
+class TestMatchByDeadline(unittest.TestCase):
+    def test_earliest_deadlines_take_earliest_slots(self):
+        tasks, slots = scheduler.match_by_deadline(np.array([30.0, 10.0, np.inf]), np.array([20.0, 0.0, 10.0]))
+
+        self.assertEqual(dict(zip(tasks.tolist(), slots.tolist())), {1: 1, 0: 2, 2: 0})
+
+    def test_tasks_without_reachable_slot_stay_unassigned(self):
+        tasks, slots = scheduler.match_by_deadline(np.array([5.0, 5.0, 50.0]), np.array([0.0, 10.0]))
+
+        self.assertEqual(tasks.tolist(), [0, 2])
+        self.assertEqual(slots.tolist(), [0, 1])
+
+    def test_matches_as_many_tasks_as_a_sequential_greedy(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            deadlines = rng.integers(0, 20, rng.integers(0, 15)).astype(float)
+            slot_times = rng.integers(0, 20, rng.integers(0, 15)).astype(float)
+            expected, free = 0, sorted(slot_times)
+            for deadline in sorted(deadlines):
+                if free and free[0] <= deadline:
+                    free.pop(0)
+                    expected += 1
+
+            tasks, slots = scheduler.match_by_deadline(deadlines, slot_times)
+
+            self.assertEqual(len(tasks), expected)
+            self.assertEqual(len(set(slots.tolist())), len(slots))
+            self.assertTrue((slot_times[slots] <= deadlines[tasks]).all())
+
+
+class TestPlan(unittest.TestCase):
+    def test_build_slots_skips_taken_slots(self):
+        owners, times = scheduler.build_slots(np.array([0, 1]), np.array([1, 0]), np.array([0.0, 100.0]),
+                                              capacity=3, slot_seconds=10.0)
+
+        self.assertEqual(owners.tolist(), [0, 0, 1, 1, 1])
+        self.assertEqual(times.tolist(), [10.0, 20.0, 100.0, 110.0, 120.0])
+
+    def test_tasks_prefer_inspectors_in_their_timezone(self):
+        task_groups = np.array([1, scheduler.NO_GROUP])
+        slot_groups = np.array([0, 1])
+
+        tasks, slots = scheduler.plan(np.array([np.inf, np.inf]), task_groups, np.array([0.0, 0.0]), slot_groups)
+
+        self.assertEqual(dict(zip(tasks.tolist(), slots.tolist())), {0: 1, 1: 0})
+
+    def test_day_starts_follow_each_timezone(self):
+        starts = scheduler.day_starts(date(2023, 7, 3), 9)
+
+        self.assertEqual(starts["Madrid"].utcoffset().total_seconds(), 2 * 3600)
+        self.assertEqual(starts["UK"].utcoffset().total_seconds(), 3600)
+        self.assertEqual(scheduler.group_of("mexico city"), scheduler.GROUPS.index("Mexico city"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.db import session
+
+
+class TestGetDbSession(unittest.TestCase):
+    def test_session_is_closed_once_after_request(self):
+        with patch.object(session, "get_sessionmaker") as get_sessionmaker:
+            session_local = get_sessionmaker.return_value
+            db = session_local.return_value.__enter__.return_value
+            dependency = session.get_db_session()
+
+            self.assertIs(next(dependency), db)
+            with self.assertRaises(StopIteration):
+                next(dependency)
+
+        session_local.return_value.__exit__.assert_called_once()
+        db.rollback.assert_not_called()
+
+    def test_session_is_rolled_back_when_request_fails(self):
+        with patch.object(session, "get_sessionmaker", MagicMock()) as get_sessionmaker:
+            session_local = get_sessionmaker.return_value
+            db = session_local.return_value.__enter__.return_value
+            dependency = session.get_db_session()
+            next(dependency)
+
+            with self.assertRaises(ValueError):
+                dependency.throw(ValueError("Task not found."))
+
+        db.rollback.assert_called_once()
+        session_local.return_value.__exit__.assert_called_once()
+
+
+class TestWarmUpAsyncPool(unittest.IsolatedAsyncioTestCase):
+    async def test_connections_are_opened_together_and_returned(self):
+        connections = [AsyncMock() for _ in range(3)]
+        with patch.object(session, "get_async_engine") as get_async_engine:
+            async_engine = get_async_engine.return_value
+            async_engine.connect = AsyncMock(side_effect=connections)
+
+            await session.warm_up_async_pool(3)
+
+        self.assertEqual(async_engine.connect.await_count, 3)
+        for connection in connections:
+            connection.close.assert_awaited_once()
+
+
+class TestGetPoolStats(unittest.TestCase):
+    def test_only_engines_already_created_are_reported(self):
+        with patch.object(session, "get_engine") as get_engine, \
+                patch.object(session, "get_async_engine") as get_async_engine:
+            get_engine.cache_info.return_value.currsize = 1
+            get_async_engine.cache_info.return_value.currsize = 0
+            engine = get_engine.return_value
+
+            stats = session.get_pool_stats()
+
+        self.assertEqual(list(stats), ["sync"])
+        self.assertIs(stats["sync"], engine.pool.metrics.snapshot.return_value)
+        get_async_engine.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
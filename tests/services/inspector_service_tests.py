@@ -1,7 +1,11 @@
 import unittest
+import uuid
+from app.core.cache import LRUCache
 from app.core.schemas import inspector_schemas as schemas
-from app.services.inspector_service import InspectorService
-from app.core.models.models import Inspector
+from app.services.inspector_service import AsyncInspectorService, InspectorService
+from app.core.models.models import Inspector, InspectorRatingStats
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from unittest.mock import Mock
 
@@ -25,7 +29,7 @@ class TestInspectorService(unittest.TestCase):
 
         self.db_mock.add.assert_called_once_with(result)
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+        self.db_mock.refresh.assert_not_called()
 
     def test_create_inspector_exception(self):
         # Arrange
@@ -41,7 +45,7 @@ class TestInspectorService(unittest.TestCase):
 
         self.db_mock.add.assert_called_once_with(result)
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+        self.db_mock.refresh.assert_not_called()
 
     def test_get_inspector(self):
         # Arrange
@@ -74,34 +78,193 @@ class TestInspectorService(unittest.TestCase):
         # Arrange
         inspector_id = '123e4567-e89b-12d3-a456-426614174000'
         inspector_update = schemas.InspectorUpdate(name='Jane Doe', email='john.doe@example.com', timezone='Mexico city')
-        inspector = Inspector(id=inspector_id, name='John Doe', email='john.doe@example.com', timezone='Madrid')
-        self.db_mock.query().filter().first.return_value = inspector
+        row = Mock(id=inspector_id, name='Jane Doe', email='john.doe@example.com', timezone='Mexico city')
+        self.db_mock.execute().first.return_value = row
 
         # Act
         result = self.service.update_inspector(inspector_id, inspector_update)
 
         # Assert
-        self.assertIsInstance(result, Inspector)
-        self.assertEqual(result.id, inspector_id)
-        self.assertEqual(result.name, inspector_update.name)
-        self.assertEqual(result.email, inspector.email)
-
+        self.assertIs(result, row)
+        statement = self.db_mock.execute.call_args[0][0]
+        self.assertIn("RETURNING", str(statement.compile(dialect=postgresql.dialect())))
+        self.db_mock.query.assert_not_called()
+        self.db_mock.refresh.assert_not_called()
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+
+    def test_update_inspector_not_found(self):
+        # Arrange
+        inspector_update = schemas.InspectorUpdate(name='Jane Doe', email='john.doe@example.com', timezone='Mexico city')
+        self.db_mock.execute().first.return_value = None
+
+        # Act
+        with self.assertRaises(ValueError):
+            self.service.update_inspector('123e4567-e89b-12d3-a456-426614174000', inspector_update)
+
+        # Assert
+        self.db_mock.commit.assert_not_called()
+        self.db_mock.rollback.assert_called_once()
 
     def test_delete_inspector(self):
         # Arrange
         inspector_id = '123e4567-e89b-12d3-a456-426614174000'
-        inspector = Inspector(id=inspector_id, name='John Doe', email='john.doe@example.com')
-        self.db_mock.query().filter().first.return_value = inspector
+        self.db_mock.execute().first.return_value = Mock(id=inspector_id)
 
         # Act
         self.service.delete_inspector(inspector_id)
 
         # Assert
-        self.db_mock.delete.assert_called_once_with(inspector)
+        statement = self.db_mock.execute.call_args[0][0]
+        self.assertIn("DELETE FROM inspectors", str(statement.compile(dialect=postgresql.dialect())))
+        self.db_mock.delete.assert_not_called()
         self.db_mock.commit.assert_called_once()
 
 
+class TestAsyncInspectorService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db_mock = Mock(AsyncSession)
+        self.service = AsyncInspectorService(db=self.db_mock)
+
+    async def test_create_inspector(self):
+        # Arrange
+        inspector_create = schemas.InspectorCreate(name='John Doe', email='john.doe@example.com', timezone='Madrid')
+
+        # Act
+        result = await self.service.create_inspector(inspector_create)
+
+        # Assert
+        self.assertIsInstance(result, Inspector)
+        self.assertEqual(result.name, inspector_create.name)
+        self.db_mock.add.assert_called_once_with(result)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_create_inspector_exception(self):
+        # Arrange
+        inspector_create = schemas.InspectorCreate(name='John Doe', email='john.doe@example.com', timezone='Madrid')
+        self.db_mock.commit.side_effect = Exception("Error committing to database")
+
+        # Act
+        with self.assertRaises(Exception):
+            await self.service.create_inspector(inspector_create)
+
+        # Assert
+        self.db_mock.rollback.assert_awaited_once()
+
+    async def test_get_inspector(self):
+        # Arrange
+        inspector_id = '123e4567-e89b-12d3-a456-426614174000'
+        inspector = Inspector(id=inspector_id, name='John Doe', email='john.doe@example.com')
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.first.return_value = inspector
+
+        # Act
+        result = await self.service.get_inspector(inspector_id)
+
+        # Assert
+        self.assertIs(result, inspector)
+        self.db_mock.execute.assert_awaited_once()
+
+
+    async def test_create_inspectors_reports_duplicated_emails(self):
+        # Arrange
+        rows = [
+            {"name": "John Doe", "email": "john.doe@example.com", "timezone": "Madrid"},
+            {"name": "Jane Doe", "email": "jane.doe@example.com", "timezone": "UK"},
+        ]
+        inserted_ids = []
+
+        async def execute(statement):
+            first_id = statement.compile().params["id_m0"]
+            inserted_ids.append(first_id)
+            result = Mock()
+            result.scalars.return_value.all.return_value = [first_id]
+            return result
+
+        self.db_mock.execute.side_effect = execute
+
+        # Act
+        result = await self.service.create_inspectors(rows)
+
+        # Assert
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["items"][0]["id"], inserted_ids[0])
+        self.assertEqual(result["items"][1]["error"], "Email already registered.")
+        self.db_mock.commit.assert_awaited_once()
+
+
+    async def test_create_inspectors_rejects_values_longer_than_the_columns(self):
+        # Arrange
+        rows = [{"name": "N" * 51, "email": "john.doe@example.com", "timezone": "Madrid"}]
+
+        # Act
+        result = await self.service.create_inspectors(rows)
+
+        # Assert
+        self.assertEqual(result["created"], 0)
+        self.assertIn("name", result["items"][0]["error"])
+        self.db_mock.execute.assert_not_awaited()
+
+
+    async def test_get_inspector_is_cached(self):
+        # Arrange
+        inspector_id = uuid.uuid4()
+        inspector = Inspector(id=inspector_id, name='John Doe', email='john.doe@example.com', timezone='Madrid')
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.first.return_value = inspector
+        service = AsyncInspectorService(db=self.db_mock, cache=LRUCache("inspector", max_size=10, ttl=60))
+
+        # Act
+        first = await service.get_inspector(inspector_id)
+        second = await service.get_inspector(inspector_id)
+
+        # Assert
+        self.assertIs(first, second)
+        self.assertEqual(second.name, inspector.name)
+        self.db_mock.execute.assert_awaited_once()
+
+    async def test_delete_inspector_invalidates_cache(self):
+        # Arrange
+        inspector_id = uuid.uuid4()
+        cache = LRUCache("inspector", max_size=10, ttl=60)
+        cache.set(inspector_id, "cached")
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.first.return_value = Mock(id=inspector_id)
+        service = AsyncInspectorService(db=self.db_mock, cache=cache)
+
+        # Act
+        await service.delete_inspector(inspector_id)
+
+        # Assert
+        self.assertIsNone(cache.get(inspector_id))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_get_rating_stats_reads_the_aggregate_row(self):
+        # Arrange
+        inspector_id = uuid.uuid4()
+        stats = InspectorRatingStats(inspector_id=inspector_id, rating_count=4, rating_sum=20.0,
+                                     rating_sum_squares=104.0, recent_ratings=[5.0], histogram=[0] * 11)
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.first.return_value = Mock(InspectorRatingStats=stats)
+
+        # Act
+        result = await self.service.get_rating_stats(inspector_id)
+
+        # Assert
+        self.assertEqual(result["count"], 4)
+        self.assertEqual(result["mean"], 5.0)
+        self.assertEqual(result["variance"], 1.0)
+        statement = self.db_mock.execute.call_args[0][0]
+        self.assertIn("LEFT OUTER JOIN inspector_rating_stats", str(statement.compile(dialect=postgresql.dialect())))
+        self.db_mock.execute.assert_awaited_once()
+
+    async def test_get_rating_stats_inspector_not_found(self):
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.first.return_value = None
+
+        with self.assertRaises(ValueError):
+            await self.service.get_rating_stats(uuid.uuid4())
+
+
 if __name__ == '__main__':
     unittest.main()
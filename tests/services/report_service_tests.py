@@ -0,0 +1,31 @@
+import json
+import time
+import unittest
+import uuid
+from unittest.mock import Mock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.analytics import AssignmentSnapshot
+from app.core.schemas.task_assignment_schemas import Status
+from app.services.report_service import AsyncReportService
+
+
+class TestAsyncReportService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.snapshot = AssignmentSnapshot()
+        self.snapshot.refreshed_at = time.monotonic()
+        self.service = AsyncReportService(Mock(spec=AsyncSession), self.snapshot)
+
+    async def test_throughput_without_scheduled_assignments(self):
+        self.snapshot.apply([{"id": uuid.uuid4(), "scheduled_datetime": None, "evaluation_datetime": None,
+                              "rating": None, "status": Status.completed, "deadline": None, "timezone": "Madrid"}])
+
+        throughput = await self.service.get_throughput()
+
+        self.assertEqual(throughput[0], {"timezone": "Madrid", "completed": 1, "per_day": None})
+        json.dumps(throughput, allow_nan=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,18 @@
+import json
 import unittest
 import uuid
-from datetime import datetime
-from unittest.mock import Mock
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import AsyncMock, Mock
 
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.models import models
 from app.core.models.models import TaskAssignment
 from app.core.schemas import task_assignment_schemas
-from app.services.task_assignment_service import TaskAssignmentService as Service
+from app.services.task_assignment_service import AsyncTaskAssignmentService, TaskAssignmentService as Service
 
 
 class TaskAssignmentServiceTest(unittest.TestCase):
@@ -41,7 +45,7 @@ class TaskAssignmentServiceTest(unittest.TestCase):
 
         self.db_mock.add.assert_called_once_with(result)
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+        self.db_mock.refresh.assert_not_called()
 
     def test_assign_task_exception(self):
         inspector_id = uuid.uuid4()
@@ -72,7 +76,7 @@ class TaskAssignmentServiceTest(unittest.TestCase):
 
         self.db_mock.add.assert_called_once_with(result)
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+        self.db_mock.refresh.assert_not_called()
 
     def test_finish_task_exception(self):
         task_assignment_id = uuid.uuid4()
@@ -140,7 +144,7 @@ class TaskAssignmentServiceTest(unittest.TestCase):
         self.assertIsInstance(result[0], models.TaskAssignment)
         self.assertEqual(result, expected_result)
         self.db_mock.query.assert_called_once_with(models.TaskAssignment)
-        self.db_mock.close.assert_called_once()
+        self.db_mock.close.assert_not_called()
 
     def test_get_from_inspector(self):
         inspector_id = uuid.uuid4()
@@ -162,7 +166,7 @@ class TaskAssignmentServiceTest(unittest.TestCase):
         self.assertEqual(result, expected_result)
         self.db_mock.query.assert_called_once_with(models.TaskAssignment)
         # self.db_mock.filter.assert_called_once_with(models.TaskAssignment.inspector_id == inspector_id)
-        self.db_mock.close.assert_called_once()
+        self.db_mock.close.assert_not_called()
 
     def test_get_unfinished_from_inspector(self):
         inspector_id = uuid.uuid4()
@@ -185,42 +189,540 @@ class TaskAssignmentServiceTest(unittest.TestCase):
             call(models.TaskAssignment.inspector_id == inspector_id),
             call((models.TaskAssignment.status == "pending") | (models.TaskAssignment.status == "on progress"))
         ])"""
-        self.db_mock.close.assert_called_once()
+        self.db_mock.close.assert_not_called()
 
     def test_update_assigned_task(self):
         # Arrange
         uuid_mock = uuid.uuid4()
-        task_assignment = models.TaskAssignment(
-            id=uuid_mock, inspector_id=uuid.uuid4(),
-            task_id=uuid.uuid4(), scheduled_datetime=datetime.now(), status="pending")
-        self.db_mock.query().filter().first.return_value = task_assignment
+        row = Mock(id=uuid_mock, inspector_id=uuid.uuid4(), task_id=uuid.uuid4(), scheduled_datetime=datetime.now(),
+                   status="in progress")
+        self.db_mock.execute.return_value.first.return_value = row
 
-        update_data = {"status": "completed", "rating": 8.0, "rating_description": "Very good!"}
-        task_update = task_assignment_schemas.TaskAssignmentUpdate(**update_data)
+        task_update = task_assignment_schemas.TaskAssignmentUpdate(scheduled_datetime=row.scheduled_datetime,
+                                                                   status="in progress")
 
         # Act
         updated_task_assignment = self.service.update_assigned_task(uuid_mock, task_update)
 
         # Assert
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(task_assignment)
+        self.db_mock.refresh.assert_not_called()
         self.assertEqual(updated_task_assignment.status, task_update.status)
+        statement = self.db_mock.execute.call_args[0][0]
+        self.assertIn("RETURNING", str(statement.compile(dialect=postgresql.dialect())))
 
     def test_delete_assigned_task(self):
         # Arrange
         uuid_mock = uuid.uuid4()
-        task_assignment = models.TaskAssignment(
-            id=uuid_mock, inspector_id=uuid.uuid4(),
-            task_id=uuid.uuid4(), scheduled_datetime=datetime.now(), status="pending")
-        self.db_mock.query().filter().first.return_value = task_assignment
+        self.db_mock.execute.return_value.first.return_value = Mock(id=uuid_mock)
 
         # Act
         self.service.delete_assigned_task(uuid_mock)
 
         # Assert
-        self.db_mock.delete.assert_called_once_with(task_assignment)
+        self.db_mock.delete.assert_not_called()
         self.db_mock.commit.assert_called_once()
 
+    def test_delete_assigned_task_leaves_tombstone(self):
+        # Arrange
+        self.db_mock.execute.return_value.first.return_value = Mock()
+
+        # Act
+        self.service.delete_assigned_task(uuid.uuid4())
+
+        # Assert
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("WITH deleted AS", sql)
+        self.assertIn("DELETE FROM task_assignments", sql)
+        self.assertIn("INSERT INTO deleted_records", sql)
+
+    def test_delete_assigned_task_not_found(self):
+        # Arrange
+        self.db_mock.execute.return_value.first.return_value = None
+
+        # Act
+        with self.assertRaises(ValueError):
+            self.service.delete_assigned_task(uuid.uuid4())
+
+        # Assert
+        self.db_mock.commit.assert_not_called()
+        self.db_mock.rollback.assert_called_once()
+
+
+class AsyncTaskAssignmentServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.db_mock = Mock(spec=AsyncSession)
+        self.service = AsyncTaskAssignmentService(db=self.db_mock)
+
+    async def test_assign_task(self):
+        inspector_id = uuid.uuid4()
+        task_id = uuid.uuid4()
+        deadline = datetime.strptime("2023-04-27T16:21:24.645804+02:00", "%Y-%m-%dT%H:%M:%S.%f%z")
+        task_assignment_create_schema = task_assignment_schemas.TaskAssignmentCreate(scheduled_datetime=deadline,
+                                                                                     status="pending")
+        self.db_mock.get.side_effect = [
+            models.Inspector(id=inspector_id, name="John Doe"),
+            models.Task(id=task_id, title="Test task", deadline=deadline, location="Madrid"),
+        ]
+
+        result = await self.service.assign_task(inspector_id, task_id, task_assignment_create_schema)
+
+        self.assertIsInstance(result, TaskAssignment)
+        self.assertEqual(result.task_id, task_id)
+        self.assertEqual(result.inspector_id, inspector_id)
+        self.db_mock.add.assert_called_once_with(result)
+        self.db_mock.commit.assert_awaited_once()
+        notify = self.db_mock.execute.call_args[0][0]
+        self.assertIn("pg_notify", str(notify.compile(dialect=postgresql.dialect())))
+
+    async def test_delete_assigned_task_publishes_event(self):
+        inspector_id = uuid.uuid4()
+        task_assignment_id = uuid.uuid4()
+        deleted = Mock()
+        deleted.first.return_value = Mock(record_id=task_assignment_id, inspector_id=inspector_id)
+        self.db_mock.execute.side_effect = [deleted, Mock()]
+
+        await self.service.delete_assigned_task(task_assignment_id)
+
+        notify = self.db_mock.execute.call_args_list[1][0][0]
+        payloads = notify.compile().params["param_1"]
+        self.assertEqual(json.loads(payloads[0]), {"event": "deleted", "inspector_id": str(inspector_id),
+                                                   "task_assignment_id": str(task_assignment_id)})
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_claim_next_skips_locked_tasks(self):
+        inspector_id = uuid.uuid4()
+        task_assignment_id = uuid.uuid4()
+        task_assignment_create_schema = task_assignment_schemas. \
+            TaskAssignmentCreate(scheduled_datetime=datetime.now(), status="pending")
+        self.db_mock.get.return_value = models.Inspector(id=inspector_id, name="John Doe")
+        claimed = Mock()
+        claimed.first.return_value = Mock(id=task_assignment_id, inspector_id=inspector_id)
+        self.db_mock.execute.side_effect = [claimed, Mock()]
+
+        result = await self.service.claim_next(inspector_id, task_assignment_create_schema, location="Madrid")
+
+        self.assertEqual(result.id, task_assignment_id)
+        statement = self.db_mock.execute.call_args_list[0][0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("FOR UPDATE SKIP LOCKED", sql)
+        self.assertIn("ORDER BY jobs.deadline ASC NULLS LAST", sql)
+        self.assertIn("jobs.location = ", sql)
+        self.assertIn("ON CONFLICT (task_id) DO NOTHING", sql)
+        self.assertIn("FROM candidate LEFT OUTER JOIN claimed ON true", sql)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_claim_next_retries_task_claimed_concurrently(self):
+        inspector_id = uuid.uuid4()
+        task_assignment_id = uuid.uuid4()
+        task_assignment_create_schema = task_assignment_schemas. \
+            TaskAssignmentCreate(scheduled_datetime=datetime.now(), status="pending")
+        self.db_mock.get.return_value = models.Inspector(id=inspector_id, name="John Doe")
+        conflict, claimed = Mock(), Mock()
+        conflict.first.return_value = Mock(candidate_id=uuid.uuid4(), id=None)
+        claimed.first.return_value = Mock(candidate_id=uuid.uuid4(), id=task_assignment_id, inspector_id=inspector_id)
+        self.db_mock.execute.side_effect = [conflict, claimed, Mock()]
+
+        result = await self.service.claim_next(inspector_id, task_assignment_create_schema)
+
+        self.assertEqual(result.id, task_assignment_id)
+        self.assertEqual(self.db_mock.execute.await_count, 3)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_claim_next_without_available_task(self):
+        task_assignment_create_schema = task_assignment_schemas. \
+            TaskAssignmentCreate(scheduled_datetime=datetime.now(), status="pending")
+        self.db_mock.get.return_value = models.Inspector(id=uuid.uuid4(), name="John Doe")
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.first.return_value = None
+
+        with self.assertRaises(ValueError):
+            await self.service.claim_next(uuid.uuid4(), task_assignment_create_schema)
+        self.db_mock.rollback.assert_awaited_once()
+        self.db_mock.commit.assert_not_awaited()
+
+    async def test_schedule_dry_run_does_not_write(self):
+        inspector_id = uuid.uuid4()
+        task_id = uuid.uuid4()
+        inspectors = Mock()
+        inspectors.all.return_value = [Mock(id=inspector_id, timezone="Madrid", last_scheduled=None)]
+        tasks = Mock()
+        tasks.all.return_value = [Mock(id=task_id, deadline=None, location="Madrid"),
+                                  Mock(id=uuid.uuid4(), deadline=datetime(2023, 1, 1, tzinfo=timezone.utc),
+                                       location="Madrid")]
+        self.db_mock.execute.side_effect = [inspectors, tasks]
+
+        result = await self.service.schedule(date(2023, 7, 3), dry_run=True)
+
+        self.assertEqual(result["assigned"], 1)
+        self.assertEqual(result["unassigned"], 1)
+        self.assertEqual(result["items"][0]["task_id"], task_id)
+        self.assertEqual(result["items"][0]["inspector_id"], inspector_id)
+        self.assertEqual(result["items"][0]["scheduled_datetime"].hour, 9)
+        self.assertEqual(self.db_mock.execute.await_count, 2)
+        self.db_mock.commit.assert_not_awaited()
+
+    async def test_finish_task_updates_rating_stats(self):
+        inspector_id = uuid.uuid4()
+        task_assignment_id = uuid.uuid4()
+        scheduled = datetime(2023, 4, 27, 16, 0)
+        db_task_assignment = models.TaskAssignment(id=task_assignment_id, inspector_id=inspector_id,
+                                                   scheduled_datetime=scheduled, status="pending")
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.first.return_value = db_task_assignment
+        evaluation = task_assignment_schemas.TaskAssignmentEvaluation(rating=8.0, evaluation_datetime=scheduled)
+
+        result = await self.service.finish_task(task_assignment_id, evaluation)
+
+        self.assertEqual(result.status, task_assignment_schemas.Status.completed)
+        statements = [str(call[0][0].compile(dialect=postgresql.dialect()))
+                      for call in self.db_mock.execute.call_args_list]
+        self.assertTrue(any("INSERT INTO inspector_rating_stats" in sql for sql in statements))
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_finish_task_locks_the_assignment(self):
+        scheduled = datetime(2023, 4, 27, 16, 0)
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.first.return_value = models.TaskAssignment(
+            id=uuid.uuid4(), inspector_id=uuid.uuid4(), scheduled_datetime=scheduled, status="completed", rating=4.0)
+        evaluation = task_assignment_schemas.TaskAssignmentEvaluation(rating=8.0, evaluation_datetime=scheduled)
+
+        await self.service.finish_task(uuid.uuid4(), evaluation)
+
+        select_sql = str(self.db_mock.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn("FOR UPDATE", select_sql)
+        rating_stats = self.db_mock.execute.call_args_list[1][0][0].compile()
+        self.assertEqual(rating_stats.params["count_delta"], 0)
+        self.assertEqual(rating_stats.params["sum_delta"], 4.0)
+
+    async def test_delete_assigned_task_retracts_its_rating(self):
+        inspector_id = uuid.uuid4()
+        deleted = Mock()
+        deleted.first.return_value = Mock(record_id=uuid.uuid4(), inspector_id=inspector_id,
+                                          status=task_assignment_schemas.Status.completed, rating=7.0)
+        self.db_mock.execute.side_effect = [deleted, Mock(), Mock()]
+
+        await self.service.delete_assigned_task(uuid.uuid4())
+
+        rating_stats = self.db_mock.execute.call_args_list[1][0][0].compile()
+        self.assertEqual(rating_stats.params["inspector_id"], inspector_id)
+        self.assertEqual(rating_stats.params["count_delta"], -1)
+        self.assertEqual(rating_stats.params["sum_delta"], -7.0)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_delete_unrated_assigned_task_leaves_rating_stats(self):
+        deleted = Mock()
+        deleted.first.return_value = Mock(record_id=uuid.uuid4(), inspector_id=uuid.uuid4(),
+                                          status=task_assignment_schemas.Status.pending, rating=None)
+        self.db_mock.execute.side_effect = [deleted, Mock()]
+
+        await self.service.delete_assigned_task(uuid.uuid4())
+
+        self.assertEqual(self.db_mock.execute.await_count, 2)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_update_assigned_task_out_of_completed_retracts_its_rating(self):
+        updated = Mock()
+        updated.first.return_value = Mock(id=uuid.uuid4(), inspector_id=uuid.uuid4(), rating=6.0,
+                                          status=task_assignment_schemas.Status.in_progress,
+                                          previous_status=task_assignment_schemas.Status.completed)
+        self.db_mock.execute.side_effect = [updated, Mock(), Mock()]
+        task_assignment_update_schema = task_assignment_schemas.TaskAssignmentUpdate(
+            scheduled_datetime=datetime.now(), status="in progress")
+
+        await self.service.update_assigned_task(uuid.uuid4(), task_assignment_update_schema)
+
+        update_sql = str(self.db_mock.execute.call_args_list[0][0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn("FOR UPDATE", update_sql)
+        self.assertIn("previous.status AS previous_status", update_sql)
+        rating_stats = self.db_mock.execute.call_args_list[1][0][0].compile()
+        self.assertEqual(rating_stats.params["count_delta"], -1)
+        self.assertEqual(rating_stats.params["sum_delta"], -6.0)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_update_completed_assigned_task_keeps_its_rating(self):
+        updated = Mock()
+        updated.first.return_value = Mock(id=uuid.uuid4(), inspector_id=uuid.uuid4(), rating=6.0,
+                                          status=task_assignment_schemas.Status.completed,
+                                          previous_status=task_assignment_schemas.Status.completed)
+        self.db_mock.execute.side_effect = [updated, Mock()]
+        task_assignment_update_schema = task_assignment_schemas.TaskAssignmentUpdate(
+            scheduled_datetime=datetime.now(), status="completed")
+
+        await self.service.update_assigned_task(uuid.uuid4(), task_assignment_update_schema)
+
+        self.assertEqual(self.db_mock.execute.await_count, 2)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_assign_task_inspector_not_found(self):
+        task_assignment_create_schema = task_assignment_schemas. \
+            TaskAssignmentCreate(scheduled_datetime=datetime.now(), status="pending")
+        self.db_mock.get.return_value = None
+
+        with self.assertRaises(ValueError):
+            await self.service.assign_task(uuid.uuid4(), uuid.uuid4(), task_assignment_create_schema)
+        self.db_mock.rollback.assert_awaited_once()
+        self.db_mock.add.assert_not_called()
+
+    async def test_get_unfinished_from_inspector(self):
+        inspector_id = uuid.uuid4()
+        expected_result = [
+            models.TaskAssignment(id=uuid.uuid4(), scheduled_datetime=datetime.now(), inspector_id=inspector_id,
+                                  status="pending"),
+        ]
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.all.return_value = expected_result
+
+        result = await self.service.get_unfinished_from_inspector(inspector_id)
+
+        self.assertEqual(result["items"], expected_result)
+        self.assertIsNone(result["next_cursor"])
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("task_assignments.status < ", sql)
+        self.db_mock.execute.assert_awaited_once()
+
+    async def test_assign_tasks_validates_in_one_query(self):
+        deadline = datetime.strptime("2023-04-27T16:21:24.645804+02:00", "%Y-%m-%dT%H:%M:%S.%f%z")
+        task_ids = [uuid.uuid4() for _ in range(4)]
+        rows = [{"inspector_id": uuid.uuid4(), "task_id": task_id, "scheduled_datetime": deadline}
+                for task_id in task_ids]
+        rows.append({"inspector_id": uuid.uuid4(), "task_id": task_ids[0], "scheduled_datetime": deadline})
+        rows.append({"task_id": uuid.uuid4()})
+
+        validation = Mock()
+        validation.all.return_value = [
+            Mock(position=0, inspector_found=True, task_found=True, after_deadline=False, assigned=False,
+                 booked=False),
+            Mock(position=1, inspector_found=False, task_found=True, after_deadline=False, assigned=False,
+                 booked=False),
+            Mock(position=2, inspector_found=True, task_found=True, after_deadline=False, assigned=True, booked=False),
+            Mock(position=3, inspector_found=True, task_found=True, after_deadline=True,
+                 assigned=False, booked=False),
+            Mock(position=4, inspector_found=True, task_found=True, after_deadline=False, assigned=False, booked=False),
+        ]
+        statements = []
+
+        async def execute(statement):
+            statements.append(statement)
+            if len(statements) == 1:
+                return validation
+            inserted = Mock()
+            if len(statements) == 2:
+                inserted.scalars.return_value.all.return_value = [statement.compile().params["id_m0"]]
+            return inserted
+
+        self.db_mock.execute.side_effect = execute
+
+        result = await self.service.assign_tasks(rows)
+
+        errors = {item["index"]: item.get("error") for item in result["items"]}
+        self.assertEqual(result["created"], 1)
+        self.assertIsNone(errors[0])
+        self.assertEqual(errors[1], "Inspector not found.")
+        self.assertEqual(errors[2], "Task already assigned.")
+        self.assertEqual(errors[3], "Scheduled datetime is after deadline.")
+        self.assertEqual(errors[4], "Task already assigned.")
+        self.assertIn("scheduled_datetime", errors[5])
+        self.assertEqual(len(statements), 3)
+        self.assertIn("pg_notify", str(statements[2].compile(dialect=postgresql.dialect())))
+        self.assertEqual(len(statements[2].compile().params["param_1"]), 1)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_assign_tasks_rejects_double_bookings(self):
+        inspector_id = uuid.uuid4()
+        scheduled = datetime(2023, 4, 27, 9, tzinfo=timezone.utc)
+        rows = [{"inspector_id": inspector_id, "task_id": uuid.uuid4(), "scheduled_datetime": scheduled},
+                {"inspector_id": inspector_id, "task_id": uuid.uuid4(),
+                 "scheduled_datetime": scheduled + timedelta(minutes=30)},
+                {"inspector_id": uuid.uuid4(), "task_id": uuid.uuid4(), "scheduled_datetime": scheduled}]
+        validation = Mock()
+        validation.all.return_value = [
+            Mock(position=0, inspector_found=True, task_found=True, after_deadline=False, assigned=False,
+                 booked=False),
+            Mock(position=1, inspector_found=True, task_found=True, after_deadline=False, assigned=False, booked=False),
+            Mock(position=2, inspector_found=True, task_found=True, after_deadline=False, assigned=False, booked=True),
+        ]
+        statements = []
+
+        async def execute(statement):
+            statements.append(statement)
+            if len(statements) == 1:
+                return validation
+            inserted = Mock()
+            if len(statements) == 2:
+                inserted.scalars.return_value.all.return_value = [statement.compile().params["id_m0"]]
+            return inserted
+
+        self.db_mock.execute.side_effect = execute
+
+        result = await self.service.assign_tasks(rows)
+
+        errors = {item["index"]: item.get("error") for item in result["items"]}
+        self.assertIsNone(errors[0])
+        self.assertEqual(errors[1], "Inspector already booked at that time.")
+        self.assertEqual(errors[2], "Inspector already booked at that time.")
+        self.assertIn("bookings.scheduled_slot && tstzrange(",
+                      str(statements[0].compile(dialect=postgresql.dialect())))
+
+    async def test_assign_tasks_compares_naive_and_aware_datetimes_in_utc(self):
+        inspector_id = uuid.uuid4()
+        rows = [{"inspector_id": inspector_id, "task_id": uuid.uuid4(),
+                 "scheduled_datetime": datetime(2023, 4, 27, 11, tzinfo=timezone(timedelta(hours=2)))},
+                {"inspector_id": inspector_id, "task_id": uuid.uuid4(), "scheduled_datetime": "2023-04-27T09:30:00"}]
+        validation = Mock()
+        validation.all.return_value = [
+            Mock(position=index, inspector_found=True, task_found=True, after_deadline=False, assigned=False,
+                 booked=False)
+            for index in range(2)]
+        statements = []
+
+        async def execute(statement):
+            statements.append(statement)
+            if len(statements) == 1:
+                return validation
+            inserted = Mock()
+            if len(statements) == 2:
+                inserted.scalars.return_value.all.return_value = [statement.compile().params["id_m0"]]
+            return inserted
+
+        self.db_mock.execute.side_effect = execute
+
+        result = await self.service.assign_tasks(rows)
+
+        errors = {item["index"]: item.get("error") for item in result["items"]}
+        self.assertIsNone(errors[0])
+        self.assertEqual(errors[1], "Inspector already booked at that time.")
+        validation_sql = str(statements[0].compile(dialect=postgresql.dialect()))
+        self.assertIn("requested.scheduled_datetime > jobs.deadline AS after_deadline", validation_sql)
+        self.assertEqual(statements[1].compile().params["scheduled_datetime_m0"],
+                         datetime(2023, 4, 27, 9, tzinfo=timezone.utc))
+
+    async def test_assign_tasks_reports_conflicts_committed_after_validation(self):
+        scheduled = datetime(2023, 4, 27, 9, tzinfo=timezone.utc)
+        rows = [{"inspector_id": uuid.uuid4(), "task_id": uuid.uuid4(), "scheduled_datetime": scheduled}
+                for _ in range(2)]
+        validation = Mock()
+        validation.all.return_value = [
+            Mock(position=index, inspector_found=True, task_found=True, after_deadline=False, assigned=False,
+                 booked=False)
+            for index in range(2)]
+        inserted, assigned = Mock(), Mock()
+        inserted.scalars.return_value.all.return_value = []
+        assigned.scalars.return_value.all.return_value = [rows[0]["task_id"]]
+        self.db_mock.execute.side_effect = [validation, inserted, assigned, Mock()]
+
+        result = await self.service.assign_tasks(rows)
+
+        errors = {item["index"]: item.get("error") for item in result["items"]}
+        self.assertEqual(result["created"], 0)
+        self.assertEqual(errors[0], "Task already assigned.")
+        self.assertEqual(errors[1], "Inspector already booked at that time.")
+        insert = self.db_mock.execute.call_args_list[1][0][0]
+        self.assertIn("ON CONFLICT DO NOTHING", str(insert.compile(dialect=postgresql.dialect())))
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_update_assigned_task_overlap_raises_value_error(self):
+        error = IntegrityError("UPDATE", {}, Mock(pgcode="23P01"))
+        self.db_mock.execute.side_effect = error
+        task_assignment_update_schema = task_assignment_schemas.TaskAssignmentUpdate(
+            scheduled_datetime=datetime.now(), status="pending")
+
+        with self.assertRaises(ValueError) as context:
+            await self.service.update_assigned_task(uuid.uuid4(), task_assignment_update_schema)
+        self.assertIs(context.exception.__cause__, error)
+        self.db_mock.rollback.assert_awaited_once()
+
+    async def test_stream_assigned_tasks_leaves_out_scheduled_slot(self):
+        async def partitions(batch_size):
+            yield [{"id": uuid.uuid4()}]
+
+        result = Mock()
+        result.mappings.return_value.partitions = partitions
+        self.db_mock.stream = AsyncMock(return_value=result)
+
+        batches = [batch async for batch in self.service.stream_assigned_tasks()]
+
+        self.assertEqual(len(batches), 1)
+        sql = str(self.db_mock.stream.call_args[0][0].compile(dialect=postgresql.dialect()))
+        self.assertIn("task_assignments.scheduled_datetime", sql)
+        self.assertNotIn("scheduled_slot", sql)
+
+    async def test_get_version_from_inspector(self):
+        last_update = datetime.now()
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.one.return_value = (2, last_update)
+
+        result = await self.service.get_version_from_inspector(uuid.uuid4(), finished=True)
+
+        self.assertEqual(result, (2, last_update))
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("count(*)", sql)
+        self.assertIn("max(task_assignments.last_update)", sql)
+        self.assertIn("task_assignments.status = ", sql)
+
+    async def test_get_changes_from_inspector(self):
+        since = datetime(2023, 4, 27, 16, 0, tzinfo=timezone.utc)
+        updated = datetime(2023, 4, 27, 16, 5, tzinfo=timezone.utc)
+        assignment = models.TaskAssignment(id=uuid.uuid4(), last_update=updated)
+        task = models.Task(id=uuid.uuid4(), last_update=datetime(2023, 4, 27, 16, 1, tzinfo=timezone.utc))
+        tombstone = models.DeletedRecord(record_id=uuid.uuid4(),
+                                         deleted_at=datetime(2023, 4, 27, 16, 10, tzinfo=timezone.utc))
+        self.db_mock.execute.side_effect = self.change_results([assignment], [task], [tombstone])
+
+        changes = await self.service.get_changes_from_inspector(uuid.uuid4(), since)
+
+        self.assertEqual(changes["assignments"], [assignment])
+        self.assertEqual(changes["tasks"], [task])
+        self.assertEqual(changes["deleted"], [{"id": tombstone.record_id, "deleted_at": tombstone.deleted_at}])
+        self.assertEqual(changes["watermark"], tombstone.deleted_at)
+        statement = self.db_mock.execute.call_args_list[0][0][0]
+        self.assertIn("task_assignments.last_update > ", str(statement.compile(dialect=postgresql.dialect())))
+
+    async def test_get_changes_sends_old_task_newly_assigned(self):
+        since = datetime(2023, 4, 27, 16, 0, tzinfo=timezone.utc)
+        updated = datetime(2023, 4, 27, 16, 5, tzinfo=timezone.utc)
+        assignment = models.TaskAssignment(id=uuid.uuid4(), last_update=updated)
+        task = models.Task(id=uuid.uuid4(), last_update=datetime(2023, 4, 1, 9, 0, tzinfo=timezone.utc))
+        self.db_mock.execute.side_effect = self.change_results([assignment], [task], [])
+
+        changes = await self.service.get_changes_from_inspector(uuid.uuid4(), since)
+
+        self.assertEqual(changes["tasks"], [task])
+        self.assertEqual(changes["watermark"], assignment.last_update)
+        statement = self.db_mock.execute.call_args_list[1][0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("jobs.last_update > %(last_update_1)s OR task_assignments.last_update > %(last_update_2)s", sql)
+
+    async def test_get_changes_takes_naive_since_as_utc(self):
+        updated = datetime(2023, 4, 27, 16, 5, tzinfo=timezone.utc)
+        assignment = models.TaskAssignment(id=uuid.uuid4(), last_update=updated)
+        self.db_mock.execute.side_effect = self.change_results([assignment], [], [])
+
+        changes = await self.service.get_changes_from_inspector(uuid.uuid4(), datetime(2023, 4, 27, 16, 0))
+
+        self.assertEqual(changes["watermark"], assignment.last_update)
+        statement = self.db_mock.execute.call_args_list[0][0][0]
+        self.assertEqual(statement.compile().params["last_update_1"].tzinfo, timezone.utc)
+
+    async def test_get_changes_without_changes_keeps_watermark(self):
+        since = datetime(2023, 4, 27, 16, 0, tzinfo=timezone.utc)
+        self.db_mock.execute.side_effect = self.change_results([], [], [])
+
+        changes = await self.service.get_changes_from_inspector(uuid.uuid4(), since)
+
+        self.assertEqual(changes["watermark"], since)
+
+    @staticmethod
+    def change_results(*rows_per_query):
+        results = []
+        for rows in rows_per_query:
+            result = Mock()
+            result.scalars.return_value.all.return_value = rows
+            results.append(result)
+        return results
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,12 +4,14 @@ from datetime import datetime
 from typing import List
 from unittest.mock import Mock
 
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.models import models
 from app.core.models.models import Task
 from app.core.schemas import task_schemas as schemas
-from app.services.task_service import TaskService
+from app.services.task_service import AsyncTaskService, TaskService
 
 
 class TaskServiceTest(unittest.TestCase):
@@ -31,7 +33,7 @@ class TaskServiceTest(unittest.TestCase):
 
         self.db_mock.add.assert_called_once_with(result)
         self.db_mock.commit.assert_called_once()
-        self.db_mock.refresh.assert_called_once_with(result)
+        self.db_mock.refresh.assert_not_called()
 
     def test_create_task_exception(self):
         task_create_schema = schemas.TaskCreate(
@@ -106,7 +108,7 @@ class TaskServiceTest(unittest.TestCase):
             deadline=datetime.now(),
             location="Madrid"
         )
-        self.db_mock.query.return_value.join.return_value.filter.return_value.all.return_value = [task]
+        self.db_mock.query.return_value.filter.return_value.all.return_value = [task]
 
         result = self.service.get_available_tasks()
 
@@ -118,7 +120,7 @@ class TaskServiceTest(unittest.TestCase):
         self.assertEqual(result[0].location, task.location)
 
     def test_get_available_tasks_exception(self):
-        self.db_mock.query.return_value.join.return_value.filter.return_value.all.side_effect = \
+        self.db_mock.query.return_value.filter.return_value.all.side_effect = \
             Exception("Error querying database")
 
         with self.assertRaises(Exception):
@@ -129,48 +131,57 @@ class TaskServiceTest(unittest.TestCase):
         uuid_mock = uuid.uuid4()
         task_update = schemas.TaskUpdate(title="Updated task", description="Updated task description",
                                          deadline=datetime.now(), location="New York")
-        task = models.Task(id=uuid_mock, title="Test task", description="Task description", deadline=datetime.now(),
-                           location="Madrid")
-        self.db_mock.query().filter().first.return_value = task
+        row = Mock(id=uuid_mock, title=task_update.title, description=task_update.description,
+                   deadline=task_update.deadline, location=task_update.location)
+        self.db_mock.execute.return_value.first.return_value = row
 
         result = self.service.update_task(uuid_mock, task_update)
 
-        self.assertIsInstance(result, Task)
-        self.assertEqual(result.id, task.id)
-        self.assertEqual(result.title, task_update.title)
-        self.assertEqual(result.description, task_update.description)
-        self.assertEqual(result.deadline, task_update.deadline)
-        self.assertEqual(result.location, task_update.location)
+        self.assertIs(result, row)
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("UPDATE jobs SET", sql)
+        self.assertIn("RETURNING", sql)
+        self.assertNotIn("search_vector", sql)
+        self.db_mock.query.assert_not_called()
+        self.db_mock.commit.assert_called_once()
+        self.db_mock.refresh.assert_not_called()
 
     def test_update_task_exception(self):
-        uuid_mock = uuid.uuid4()
         task_update = schemas.TaskUpdate(title="Updated task", description="Updated task description",
                                          deadline=datetime.now(), location="New York")
-        self.db_mock.query.return_value.filter.return_value.first.side_effect = \
-            Exception("Error updating task in database")
+        self.db_mock.execute.side_effect = Exception("Error updating task in database")
 
         with self.assertRaises(Exception) as context:
             self.service.update_task(uuid.uuid4(), task_update)
 
         self.assertEqual(str(context.exception), "Error updating task in database")
-        #self.db_mock.rollback.assert_called_once()
+        self.db_mock.rollback.assert_called_once()
+
+    def test_update_task_not_found(self):
+        task_update = schemas.TaskUpdate(title="Updated task", description="Updated task description",
+                                         deadline=datetime.now(), location="New York")
+        self.db_mock.execute.return_value.first.return_value = None
+
+        with self.assertRaises(ValueError):
+            self.service.update_task(uuid.uuid4(), task_update)
+        self.db_mock.commit.assert_not_called()
 
     def test_delete_task(self):
         uuid_mock = uuid.uuid4()
-        task = models.Task(id=uuid_mock, title="Test task", description="Task description", deadline=datetime.now(),
-                           location="Madrid")
-        self.db_mock.query().filter().first.return_value = task
+        self.db_mock.execute.return_value.first.return_value = Mock(id=uuid_mock)
 
         # Act
         self.service.delete_task(uuid_mock)
 
         # Assert
-        self.db_mock.delete.assert_called_once_with(task)
+        statement = self.db_mock.execute.call_args[0][0]
+        self.assertIn("DELETE FROM jobs", str(statement.compile(dialect=postgresql.dialect())))
+        self.db_mock.delete.assert_not_called()
         self.db_mock.commit.assert_called_once()
 
     def test_delete_task_exception(self):
-        uuid_mock = uuid.uuid4()
-        self.db_mock.query().filter().first.side_effect = Exception("Error deleting task in database")
+        self.db_mock.execute.side_effect = Exception("Error deleting task in database")
 
         # Act
         with self.assertRaises(Exception) as context:
@@ -179,5 +190,100 @@ class TaskServiceTest(unittest.TestCase):
         self.assertEqual(str(context.exception), "Error deleting task in database")
 
 
+class AsyncTaskServiceTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.db_mock = Mock(spec=AsyncSession)
+        self.service = AsyncTaskService(db=self.db_mock)
+
+    async def test_create_task(self):
+        task_create_schema = schemas.TaskCreate(title="Test task", description="Task description",
+                                                deadline=datetime.now(), location="Madrid")
+
+        result = await self.service.create_task(task_create_schema)
+
+        self.assertIsInstance(result, Task)
+        self.assertEqual(result.title, task_create_schema.title)
+        self.db_mock.add.assert_called_once_with(result)
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_get_tasks(self):
+        task = models.Task(id=uuid.uuid4(), title="Test task", description="Task description",
+                           deadline=datetime.now(), location="Madrid")
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.all.return_value = [task]
+
+        result = await self.service.get_tasks(limit=1)
+
+        self.assertEqual(result, {"items": [task], "next_cursor": None})
+
+    async def test_get_tasks_exception(self):
+        self.db_mock.execute.side_effect = Exception("Error querying database")
+        with self.assertRaises(Exception):
+            await self.service.get_tasks()
+        self.db_mock.rollback.assert_awaited_once()
+
+
+    async def test_get_available_tasks_uses_anti_join(self):
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.scalars.return_value.all.return_value = []
+
+        await self.service.get_available_tasks(location="Madrid")
+
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("NOT (EXISTS (SELECT", sql)
+        self.assertIn("task_assignments.task_id = jobs.id", sql)
+        self.assertIn("jobs.location = ", sql)
+        self.assertNotIn("JOIN", sql)
+
+
+    async def test_search_tasks_uses_the_search_vector(self):
+        task = Task(id=uuid.uuid4(), title="Boiler inspection")
+        self.db_mock.execute.return_value = Mock()
+        self.db_mock.execute.return_value.all.return_value = [(task, 0.6)]
+
+        result = await self.service.search_tasks("boiler madrid", limit=10, after=(0.7, uuid.uuid4()))
+
+        self.assertEqual(result["items"], [task])
+        self.assertIsNone(result["next_cursor"])
+        statement = self.db_mock.execute.call_args[0][0]
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        self.assertIn("jobs.search_vector @@ websearch_to_tsquery(", sql)
+        self.assertIn("ORDER BY ts_rank(jobs.search_vector, websearch_to_tsquery(", sql)
+        self.assertIn("DESC, jobs.id", sql)
+
+    async def test_create_tasks_reports_invalid_rows(self):
+        rows = [
+            {"title": "Test task", "deadline": "2023-04-27T16:21:24+02:00", "location": "Madrid"},
+            {"title": "Missing deadline", "location": "Madrid"},
+            {"title": "Other task", "deadline": "2023-04-28T16:21:24+02:00", "location": "UK"},
+        ]
+
+        result = await self.service.create_tasks(rows)
+
+        self.assertEqual(result["created"], 2)
+        self.assertEqual(result["failed"], 1)
+        self.assertEqual([item["index"] for item in result["items"]], [0, 1, 2])
+        self.assertIn("deadline", result["items"][1]["error"])
+        self.db_mock.execute.assert_awaited_once()
+        self.db_mock.commit.assert_awaited_once()
+
+    async def test_create_tasks_rejects_values_longer_than_the_columns(self):
+        rows = [
+            {"title": "T" * 101, "deadline": "2023-04-27T16:21:24+02:00", "location": "Madrid"},
+            {"title": "Test task", "description": "D" * 501, "deadline": "2023-04-27T16:21:24+02:00",
+             "location": "Madrid"},
+            {"title": "Other task", "deadline": "2023-04-28T16:21:24+02:00", "location": "UK"},
+        ]
+
+        result = await self.service.create_tasks(rows)
+
+        self.assertEqual(result["created"], 1)
+        self.assertIn("title", result["items"][0]["error"])
+        self.assertIn("description", result["items"][1]["error"])
+        self.assertNotIn("error", result["items"][2])
+        self.db_mock.execute.assert_awaited_once()
+
+
 if __name__ == '__main__':
     unittest.main()